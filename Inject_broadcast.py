@@ -8,6 +8,12 @@ import zipfile
 
 inject_dir = "/mnt/data/light3_latest_check"  # assume this is the working unzipped dir
 
+# Build definition for build_fleet.py
+CAPSULE_BUILD = {
+    "outputs": ["/mnt/data/Light3_Reflex_Shrine_FINAL_REFLECTIVE.camp"],
+    "inputs": ["/mnt/data/light3_latest_check"],
+}
+
 # === Files to inject ===
 
 # 1. update_capsule.sh
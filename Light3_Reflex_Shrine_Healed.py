@@ -1,14 +1,32 @@
-import shutil
+import argparse
 import os
+import shutil
 import zipfile
 
+from capsule_blobs import BlobStore, make_recipe, recipe_path_for, write_recipe
+from capsule_builder import build_date_time
+from capsule_seal import CHUNK_SIZE, SealedZip
+from capsule_stage import prune, stage_file, stage_tree
+
+# Build definition for build_fleet.py
+CAPSULE_BUILD = {
+    "outputs": ["/mnt/data/Light3_Reflex_Shrine_Healed.camp"],
+    "inputs": ["/mnt/data/light3_contents"],
+    "requires": ["Capsule_Dev_Shell_Kit_SHRINE.camp", "Operator_MindCapsule.camp"],
+}
+
 # === Healing Light3 Mesh ===
 
+parser = argparse.ArgumentParser(description="Bundle the Light3 shrine into a healed .camp.")
+parser.add_argument("--stream", action="store_true",
+                    help="Read sources straight into the .camp, without staging light3_shrine_bundle "
+                         "or the blob store.")
+args = parser.parse_args()
+
 # Define paths
 source_dir = "/mnt/data/light3_contents"
 output_dir = "/mnt/data/light3_shrine_bundle"
 capsules_dir = os.path.join(output_dir, "capsules")
-os.makedirs(capsules_dir, exist_ok=True)
 
 # Move core launch and audit tools to root of output bundle
 core_files = [
@@ -22,11 +40,14 @@ optional_capsules = [
     "Capsule_Dev_Shell_Kit_SHRINE.camp", "Operator_MindCapsule.camp"
 ]
 
-# Copy all core files
+# Core files go to the bundle root (capsules built by the fleet are picked up from /mnt/data)
+sources = {}
 for file in core_files + optional_capsules:
     src = os.path.join(source_dir, file)
+    if not os.path.exists(src) and file in optional_capsules:
+        src = os.path.join("/mnt/data", file)
     if os.path.exists(src):
-        shutil.copy(src, output_dir)
+        sources[file] = src
 
 # Move all capsule directories/zips into /capsules
 capsule_dirs = [
@@ -45,26 +66,71 @@ capsule_files = [
     "agent_console.html", "markdown-renderer.html", "manifest.json"
 ]
 
-# Copy capsule folders and files
-for item in capsule_dirs:
+# Capsule folders and files go under capsules/
+for item in capsule_dirs + capsule_files:
     src = os.path.join(source_dir, item)
-    dst = os.path.join(capsules_dir, item)
     if os.path.exists(src):
-        shutil.copytree(src, dst)
+        sources[f"capsules/{item}"] = src
 
-for file in capsule_files:
-    src = os.path.join(source_dir, file)
-    dst = os.path.join(capsules_dir, file)
-    if os.path.exists(src):
-        shutil.copy(src, dst)
-
-# Bundle into final healed .camp
-final_camp = "/mnt/data/Light3_Reflex_Shrine_Healed.camp"
-with zipfile.ZipFile(final_camp, 'w', zipfile.ZIP_DEFLATED) as zipf:
+if args.stream:
+    bundle_files = {}
+    for arcname, src in sources.items():
+        if os.path.isdir(src):
+            for root, _, files in os.walk(src):
+                for file in files:
+                    full_path = os.path.join(root, file)
+                    bundle_files[f"{arcname}/{os.path.relpath(full_path, src)}".replace(os.sep, "/")] = full_path
+        else:
+            bundle_files[arcname] = src
+else:
+    # Stage as hardlinks / clones where possible; unchanged items are skipped on rerun.
+    os.makedirs(capsules_dir, exist_ok=True)
+    counts = {}
+    for arcname, src in sources.items():
+        dst = os.path.join(output_dir, *arcname.split("/"))
+        if os.path.isdir(src):
+            stage_tree(src, dst, counts)
+        else:
+            outcome = stage_file(src, dst)
+            counts[outcome] = counts.get(outcome, 0) + 1
+    # Drop whatever earlier runs staged that is no longer part of the bundle.
+    removed = prune(output_dir, {a for a in sources if "/" not in a} | {"capsules"})
+    removed += prune(capsules_dir, {a.split("/", 1)[1] for a in sources if a.startswith("capsules/")})
+    if removed:
+        counts["removed"] = counts.get("removed", 0) + removed
+    print("📂 Staged: " + ", ".join(f"{n} {k}" for k, n in sorted(counts.items())))
+    bundle_files = {}
     for root, _, files in os.walk(output_dir):
         for file in files:
             full_path = os.path.join(root, file)
-            arcname = os.path.relpath(full_path, start=output_dir)
-            zipf.write(full_path, arcname=arcname)
+            bundle_files[os.path.relpath(full_path, start=output_dir).replace(os.sep, "/")] = full_path
 
+final_camp = "/mnt/data/Light3_Reflex_Shrine_Healed.camp"
+if args.stream:
+    # One pass from the sources into the sealed .camp; nothing else touches disk.
+    date_time = build_date_time()
+    with SealedZip(final_camp) as zipf:
+        for arcname in sorted(bundle_files):
+            # from_file keeps the source mode and sets file_size, which the
+            # unseekable sealed stream needs up front to pick zip64 for big files.
+            zinfo = zipfile.ZipInfo.from_file(bundle_files[arcname], arcname)
+            zinfo.date_time = date_time
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            with open(bundle_files[arcname], "rb") as src, zipf.open(zinfo, "w") as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+    # A recipe left by an earlier staged build would no longer describe this archive.
+    if os.path.exists(recipe_path_for(final_camp)):
+        os.remove(recipe_path_for(final_camp))
+    print(f"📦 {len(bundle_files)} file(s) streamed")
+else:
+    # Every staged file goes into the shared blob store, which compresses only
+    # bodies it hasn't seen before (nested capsules and repeated scripts are
+    # stored once), then the .camp is exported from it.
+    store = BlobStore()
+    entries = {arcname: dict(store.put_file(path, zipfile.ZIP_DEFLATED), mode=os.stat(path).st_mode)
+               for arcname, path in bundle_files.items()}
+    recipe = make_recipe(entries, build_date_time())
+    store.export(recipe, final_camp)
+    write_recipe(recipe_path_for(final_camp), recipe)
+    print(f"🗄 {store.stored} new blob(s), {store.reused} reused")
 print(final_camp)
@@ -1,45 +1,15 @@
-import os
-import json
-import yaml
-from zipfile import ZipFile
-import qrcode
+from capsule_blobs import store_from_env
+from capsule_builder import CapsuleBuilder
+from capsule_snippets import GPT_UI_SYNC_JS
 
-# Setup paths
-camp_dir = "/mnt/data/Operator_Browser_Cortex_v3"
-overlay_dir = os.path.join(camp_dir, "overlay")
-os.makedirs(overlay_dir, exist_ok=True)
-
-# gpt_ui_sync.js content
-gpt_ui_sync_js = """
-function sendToChatGPT(message) {
-  const inputBox = document.querySelector("textarea");
-  const submitButton = inputBox?.parentNode?.querySelector("button");
-  if (!inputBox || !submitButton) return console.warn("[Agent 0] GPT input field not found.");
-  inputBox.value = message;
-  inputBox.dispatchEvent(new Event("input", { bubbles: true }));
-  setTimeout(() => { submitButton.click(); }, 300);
+# Build definition for build_fleet.py
+CAPSULE_BUILD = {
+    "outputs": ["/mnt/data/Operator_Browser_Cortex_v3.camp"],
 }
 
-function readLatestResponse(callback) {
-  const observer = new MutationObserver(() => {
-    const responses = document.querySelectorAll(".markdown");
-    const latest = responses[responses.length - 1];
-    if (latest && latest.innerText) {
-      callback(latest.innerText);
-      observer.disconnect();
-    }
-  });
-  observer.observe(document.body, { childList: true, subtree: true });
-}
+# gpt_ui_sync.js content (shared with light.py and brpwsweragentzero.py)
+gpt_ui_sync_js = GPT_UI_SYNC_JS
 
-chrome.runtime.onMessage.addListener((msg, sender, sendResponse) => {
-  if (msg.type === "gpt_sync") {
-    sendToChatGPT(msg.prompt);
-    readLatestResponse((reply) => sendResponse({ reply }));
-    return true;
-  }
-});
-"""
 
 # manifest.json
 manifest = {
@@ -80,30 +50,17 @@ agent_console_html = """
 </html>
 """
 
-# Save files
-with open(os.path.join(overlay_dir, "gpt_ui_sync.js"), "w") as f:
-    f.write(gpt_ui_sync_js.strip())
-
-with open(os.path.join(camp_dir, "manifest.json"), "w") as f:
-    json.dump(manifest, f, indent=2)
-
-with open(os.path.join(camp_dir, "reflect.yaml"), "w") as f:
-    yaml.dump(reflect, f)
-
-with open(os.path.join(camp_dir, "agent_console.html"), "w") as f:
-    f.write(agent_console_html.strip())
+# Assemble entries in memory
+capsule = CapsuleBuilder(blob_store=store_from_env())
+capsule.add_text("overlay/gpt_ui_sync.js", gpt_ui_sync_js.strip())
+capsule.add_json("manifest.json", manifest)
+capsule.add_yaml("reflect.yaml", reflect)
+capsule.add_text("agent_console.html", agent_console_html.strip())
 
 # QR Code
-qr_path = os.path.join(camp_dir, "operator_mesh_qr.png")
-qrcode.make("camp://Operator_Browser_Cortex_v3").save(qr_path)
+capsule.add_qr("operator_mesh_qr.png", "camp://Operator_Browser_Cortex_v3")
 
 # Create the .camp ZIP
-camp_zip_path = "/mnt/data/Operator_Browser_Cortex_v3.camp"
-with ZipFile(camp_zip_path, "w") as zipf:
-    for root, _, files in os.walk(camp_dir):
-        for file in files:
-            full_path = os.path.join(root, file)
-            arcname = os.path.relpath(full_path, start=camp_dir)
-            zipf.write(full_path, arcname=arcname)
+camp_zip_path = capsule.build("/mnt/data/Operator_Browser_Cortex_v3.camp")
 
 print(camp_zip_path)
@@ -1,9 +1,10 @@
 import zipfile
-import os
+from capsule_builder import CapsuleBuilder
 
-# Re-define paths after environment reset
-capsule_dir = "/mnt/data/Operator_MindCapsule"
-os.makedirs(capsule_dir, exist_ok=True)
+# Build definition for build_fleet.py
+CAPSULE_BUILD = {
+    "outputs": ["/mnt/data/Operator_MindCapsule.camp"],
+}
 
 # Define all component files again
 components = {
@@ -86,18 +87,10 @@ navigator.mediaDevices.getUserMedia({ video: true }).then(stream => {
 """
 }
 
-# Write each component file into the capsule directory
+# Stream each component straight into the final .camp ZIP file
+capsule = CapsuleBuilder(zipfile.ZIP_DEFLATED)
 for filename, content in components.items():
-    with open(os.path.join(capsule_dir, filename), "w", encoding="utf-8") as f:
-        f.write(content)
-
-# Create final .camp ZIP file
-camp_path = "/mnt/data/Operator_MindCapsule.camp"
-with zipfile.ZipFile(camp_path, 'w', zipfile.ZIP_DEFLATED) as camp_zip:
-    for root, dirs, files in os.walk(capsule_dir):
-        for file in files:
-            file_path = os.path.join(root, file)
-            arcname = os.path.relpath(file_path, capsule_dir)
-            camp_zip.write(file_path, arcname=arcname)
+    capsule.add_text(filename, content)
+camp_path = capsule.build("/mnt/data/Operator_MindCapsule.camp")
 
 print(camp_path)
@@ -1,10 +1,12 @@
-import os
-import json
-from zipfile import ZipFile
+from capsule_builder import CapsuleBuilder
+
+# Build definition for build_fleet.py
+CAPSULE_BUILD = {
+    "outputs": ["/mnt/data/Operator_Reflex_Capsule_X_Enhanced.camp"],
+}
 
-# Base directory
-capsule_dir = "/mnt/data/Operator_Reflex_Capsule_X"
-os.makedirs(capsule_dir, exist_ok=True)
+# Capsule contents are assembled in memory
+capsule = CapsuleBuilder()
 
 # === 1. flask_gpt_sync.py ===
 flask_gpt_sync = """
@@ -87,7 +89,7 @@ if __name__ == "__main__":
             break
 """
 
-# Write new files
+# Add new files
 paths = {
     "flask_gpt_sync.py": flask_gpt_sync,
     "boss_relay.py": boss_relay,
@@ -95,20 +97,12 @@ paths = {
 }
 
 for filename, content in paths.items():
-    with open(os.path.join(capsule_dir, filename), "w") as f:
-        f.write(content.strip())
+    capsule.add_text(filename, content.strip())
 
-# Write aura-persona.json
-with open(os.path.join(capsule_dir, "aura-persona.json"), "w") as f:
-    json.dump(aura_persona, f, indent=2)
+# Add aura-persona.json
+capsule.add_json("aura-persona.json", aura_persona)
 
 # Bundle enhanced .camp
-enhanced_capsule_path = "/mnt/data/Operator_Reflex_Capsule_X_Enhanced.camp"
-with ZipFile(enhanced_capsule_path, "w") as zipf:
-    for root, _, files in os.walk(capsule_dir):
-        for file in files:
-            full_path = os.path.join(root, file)
-            arcname = os.path.relpath(full_path, start=capsule_dir)
-            zipf.write(full_path, arcname=arcname)
+enhanced_capsule_path = capsule.build("/mnt/data/Operator_Reflex_Capsule_X_Enhanced.camp")
 
 print(enhanced_capsule_path)
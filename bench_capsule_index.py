@@ -0,0 +1,104 @@
+"""Benchmark: repeated directory walks vs. the single-pass CapsuleIndex.
+
+Builds a synthetic capsule with N entries and times the lookups one audit
+performs (four metadata lookups, the file count and the reflect.yaml file
+discovery) the old way -- extract, then os.walk for each stage -- and via
+CapsuleIndex built once from the zip central directory.
+
+    python bench_capsule_index.py [--files 10000] [--rounds 3]
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+import capsule_audit_utils as cau
+
+WALKS = 0
+_os_walk = os.walk
+
+
+def _counting_walk(*args, **kwargs):
+    global WALKS
+    WALKS += 1
+    return _os_walk(*args, **kwargs)
+
+
+def make_capsule(path, n_files):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zipf:
+        zipf.writestr("manifest.json", json.dumps({"name": "bench", "version": "1.0", "manifest_version": 3}))
+        zipf.writestr("reflect.yaml", "capsule: bench\n")
+        for i in range(n_files - 2):
+            ext = (".js", ".html", ".py", ".png", ".json")[i % 5]
+            zipf.writestr(f"pkg{i % 40}/mod{i % 7}/file{i}{ext}", f"// entry {i}\n")
+
+
+def legacy_scan(capsule_path, work_dir):
+    extract_dir = os.path.join(work_dir, "extracted_bench")
+    with zipfile.ZipFile(capsule_path) as zip_ref:
+        zip_ref.extractall(extract_dir)
+    for name in ("manifest.json", "reflect.yaml", "agent_assist.yaml", "agent_personality.yaml"):
+        cau.find_file(extract_dir, name)
+    cau.count_files(extract_dir)
+    discovered = []
+    for root, _, files in os.walk(extract_dir):
+        for file in files:
+            if file.endswith((".js", ".html", ".py")):
+                discovered.append(os.path.relpath(os.path.join(root, file), start=extract_dir))
+    shutil.rmtree(extract_dir)
+    return len(discovered)
+
+
+def indexed_scan(capsule_path):
+    with zipfile.ZipFile(capsule_path) as zip_ref:
+        index = cau.CapsuleIndex.from_zip(zip_ref)
+    for name in ("manifest.json", "reflect.yaml", "agent_assist.yaml", "agent_personality.yaml"):
+        index.find(name)
+    len(index)
+    return len(index.with_ext(".js", ".html", ".py"))
+
+
+def measure(fn, *args, rounds=3):
+    global WALKS
+    best, walks, result = None, 0, None
+    for _ in range(rounds):
+        WALKS = 0
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        walks = WALKS
+        best = elapsed if best is None else min(best, elapsed)
+    return best, walks, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark capsule scanning strategies.")
+    parser.add_argument("--files", type=int, default=10000, help="Entries in the synthetic capsule.")
+    parser.add_argument("--rounds", type=int, default=3, help="Best-of rounds per strategy.")
+    args = parser.parse_args()
+
+    os.walk = _counting_walk
+    work_dir = tempfile.mkdtemp(prefix="capsule_bench_")
+    try:
+        capsule_path = os.path.join(work_dir, "bench.camp")
+        make_capsule(capsule_path, args.files)
+
+        legacy_time, legacy_walks, legacy_found = measure(legacy_scan, capsule_path, work_dir, rounds=args.rounds)
+        index_time, index_walks, index_found = measure(indexed_scan, capsule_path, rounds=args.rounds)
+        assert legacy_found == index_found, (legacy_found, index_found)
+
+        print(f"Synthetic capsule: {args.files} entries")
+        print(f"{'strategy':<22}{'os.walk calls':>15}{'seconds':>12}")
+        print(f"{'extract + walks':<22}{legacy_walks:>15}{legacy_time:>12.4f}")
+        print(f"{'CapsuleIndex':<22}{index_walks:>15}{index_time:>12.4f}")
+        print(f"Speedup: {legacy_time / index_time:.1f}x")
+    finally:
+        os.walk = _os_walk
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
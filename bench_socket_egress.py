@@ -0,0 +1,84 @@
+"""Load test: Socket.IO egress of camp_unpack_and_run_v2 versus client count.
+
+Connects N test clients to the dashboard app, has each send ``--messages``
+chat messages (stub LLM backend, so no network), waits for the replies and
+totals the bytes every client received. It runs twice per client count:
+once with replies broadcast to every client (the old behaviour, still
+available as ``SOCKETIO_BROADCAST_REPLIES=true``) and once routed to the
+sending session. Broadcast egress grows with the square of the clients,
+targeted egress linearly.
+
+    python bench_socket_egress.py [--clients 10 25 50 100] [--messages 2]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+def run_worker(clients, messages, timeout):
+    from camp_unpack_and_run_v2 import app, socketio, BROADCAST_REPLIES
+
+    conns = [socketio.test_client(app) for _ in range(clients)]
+    for conn in conns:
+        conn.get_received()  # drop the connect greeting
+    start = time.perf_counter()
+    for i, conn in enumerate(conns):
+        for m in range(messages):
+            conn.emit("send_message", {"message": f"client {i} message {m}"})
+
+    expected = clients * messages if BROADCAST_REPLIES else messages
+    received = [[] for _ in conns]
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for i, conn in enumerate(conns):
+            received[i].extend(conn.get_received())
+        if all(sum(p["name"] == "receive_message" for p in r) >= expected for r in received):
+            break
+        socketio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    sizes = [sum(len(json.dumps([p["name"], *p["args"]])) for p in r) for r in received]
+    leaked = sum(sum(p["name"] == "receive_message" for p in r) - messages for r in received)
+    for conn in conns:
+        conn.disconnect()
+    print(json.dumps({"clients": clients, "bytes": sum(sizes), "packets": sum(len(r) for r in received),
+                      "cross_session": leaked, "seconds": round(elapsed, 3)}))
+
+
+def measure(clients, messages, broadcast, timeout):
+    env = dict(os.environ, LLM_BACKEND="stub", LLM_STUB_DELAY="0", LOGGING_LEVEL="WARNING",
+               SOCKETIO_BROADCAST_REPLIES="true" if broadcast else "false")
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", "--clients", str(clients),
+                           "--messages", str(messages), "--timeout", str(timeout)],
+                          cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[10, 25, 50, 100])
+    parser.add_argument("--messages", type=int, default=2, help="Messages sent per client.")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.clients[0], args.messages, args.timeout)
+        return
+
+    print(f"{'clients':>8} {'broadcast':>12} {'targeted':>12} {'ratio':>7} {'leaked':>8}")
+    for clients in args.clients:
+        before = measure(clients, args.messages, True, args.timeout)
+        after = measure(clients, args.messages, False, args.timeout)
+        print(f"{clients:>8} {before['bytes']:>12,} {after['bytes']:>12,} "
+              f"{before['bytes'] / max(after['bytes'], 1):>6.1f}x {before['cross_session']:>8}")
+    print("\nEgress bytes received by all clients; 'leaked' counts replies delivered to other sessions "
+          "under broadcast.")
+
+
+if __name__ == "__main__":
+    main()
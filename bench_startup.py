@@ -0,0 +1,78 @@
+"""Benchmark: import-time cost of the capsule auditor CLI.
+
+``__launch.sh`` and ``launch_lin_wsl_capsule.sh`` start a fresh
+``python3 capsule_auditor.py`` on every boot, so everything imported at
+module level is paid each time. This runs ``python -X importtime`` on the
+CLI module in fresh interpreters, reports the median cumulative import
+time plus the most expensive modules, and exits non-zero when the median
+is over budget.
+
+    python bench_startup.py [--module capsule_auditor] [--runs 7] [--budget-ms 50]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+DEFAULT_MODULE = "capsule_auditor"
+DEFAULT_BUDGET_MS = 50.0
+
+
+def import_times(module):
+    """Import ``module`` in a fresh interpreter; return {name: (self_us, cumulative_us)}."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=here, capture_output=True, text=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if name.strip() == "site":
+            times.clear()  # interpreter startup, not the CLI's doing
+            continue
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def wall_ms(args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], capture_output=True, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default=DEFAULT_MODULE)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Fail if the median cumulative import time exceeds this.")
+    parser.add_argument("--top", type=int, default=10, help="Show the N modules with the highest self time.")
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.runs)]
+    totals = [run[args.module][1] / 1000 for run in runs]
+    median = statistics.median(totals)
+
+    # Per-module self time, median across runs, for the modules loaded on behalf of the CLI.
+    names = set.intersection(*(set(run) for run in runs))
+    self_ms = {name: statistics.median(run[name][0] for run in runs) / 1000 for name in names}
+    print(f"{'module':<40}  {'self ms':>8}")
+    for name, ms in sorted(self_ms.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{name:<40}  {ms:>8.2f}")
+
+    bare = statistics.median(wall_ms(["-c", "pass"]) for _ in range(args.runs))
+    cli = statistics.median(wall_ms([f"{args.module}.py", "--help"]) for _ in range(args.runs))
+    print(f"\nimport {args.module}: median {median:.1f} ms (min {min(totals):.1f}, max {max(totals):.1f}) "
+          f"over {args.runs} runs; budget {args.budget_ms:.0f} ms")
+    print(f"wall clock: bare interpreter {bare:.0f} ms, {args.module}.py --help {cli:.0f} ms")
+    if median > args.budget_ms:
+        print(f"❌ Over budget by {median - args.budget_ms:.1f} ms")
+        raise SystemExit(1)
+    print("✅ Within budget")
+
+
+if __name__ == "__main__":
+    main()
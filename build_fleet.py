@@ -0,0 +1,268 @@
+"""Build every capsule in one go, in parallel, rebuilding only what changed.
+
+Generator scripts opt in with a module-level literal, read with ``ast``
+(the script is never imported to discover it):
+
+    CAPSULE_BUILD = {
+        "outputs": ["/mnt/data/Light3_Reflex_Shrine_Healed.camp"],
+        "inputs": ["/mnt/data/light3_contents"],       # files/dirs read from disk
+        "requires": ["Operator_MindCapsule.camp"],      # outputs of other scripts
+    }
+
+``requires`` entries are matched by file name against the other scripts'
+outputs, which gives the dependency graph. Independent scripts run
+concurrently in a worker pool, each in its own interpreter, so a full
+fleet build takes about as long as its longest dependency chain.
+
+A script is skipped when its fingerprint still matches the last successful
+build. The fingerprint covers its source and the local modules it imports,
+the size and mtime of its inputs, and the ``.sig`` (or size and mtime) of
+the capsules it requires. Its outputs must also still exist.
+
+    python build_fleet.py [TARGET ...] [--jobs N] [--force] [--list]
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from capsule_seal import read_sig, sig_path_for
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STATE_PATH = "/mnt/data/.capsule_fleet_state.json"
+
+
+class CapsuleScript:
+    def __init__(self, path, spec):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.outputs = list(spec.get("outputs", []))
+        self.inputs = list(spec.get("inputs", []))
+        self.requires = list(spec.get("requires", []))
+        self.deps = set()
+
+
+def read_build_spec(path):
+    with open(path, "rb") as f:
+        try:
+            tree = ast.parse(f.read(), path)
+        except SyntaxError:
+            return None
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "CAPSULE_BUILD" for t in node.targets):
+            return ast.literal_eval(node.value)
+    return None
+
+
+def discover(repo_dir=REPO_DIR):
+    scripts = {}
+    for fname in sorted(os.listdir(repo_dir)):
+        if fname.lower().endswith(".py"):
+            spec = read_build_spec(os.path.join(repo_dir, fname))
+            if spec:
+                scripts[fname] = CapsuleScript(os.path.join(repo_dir, fname), spec)
+    return scripts
+
+
+def link(scripts):
+    """Resolve ``requires`` into script dependencies; raise on clashes or cycles."""
+    producers = {}
+    for script in scripts.values():
+        for output in script.outputs:
+            other = producers.setdefault(os.path.basename(output), script.name)
+            if other != script.name:
+                raise ValueError(f"{os.path.basename(output)} is produced by both {other} and {script.name}")
+    for script in scripts.values():
+        for required in script.requires:
+            producer = producers.get(os.path.basename(required))
+            if producer and producer != script.name:
+                script.deps.add(producer)
+
+    done, visiting = set(), set()
+
+    def visit(name, chain):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError("Dependency cycle: " + " -> ".join(chain + [name]))
+        visiting.add(name)
+        for dep in scripts[name].deps:
+            visit(dep, chain + [name])
+        visiting.discard(name)
+        done.add(name)
+
+    for name in scripts:
+        visit(name, [])
+
+
+# --- fingerprints ----------------------------------------------------------
+
+def local_imports(path, repo_dir=REPO_DIR, seen=None):
+    """``path`` plus every repo module it imports, transitively."""
+    seen = seen if seen is not None else set()
+    if path in seen:
+        return seen
+    seen.add(path)
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), path)
+    for node in ast.walk(tree):
+        names = [a.name for a in node.names] if isinstance(node, ast.Import) else \
+                [node.module] if isinstance(node, ast.ImportFrom) and node.module and not node.level else []
+        for name in names:
+            candidate = os.path.join(repo_dir, name.split(".")[0] + ".py")
+            if os.path.exists(candidate):
+                local_imports(candidate, repo_dir, seen)
+    return seen
+
+
+def _stat_signature(path):
+    if os.path.isdir(path):
+        entries = []
+        for root, _, files in os.walk(path):
+            for fname in files:
+                full = os.path.join(root, fname)
+                st = os.stat(full)
+                entries.append((os.path.relpath(full, path), st.st_size, st.st_mtime_ns))
+        return sorted(entries)
+    if os.path.exists(path):
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime_ns]
+    return None
+
+
+def _output_signature(path):
+    sig = sig_path_for(path)
+    return read_sig(sig) if os.path.exists(sig) else _stat_signature(path)
+
+
+def fingerprint(script, scripts):
+    h = hashlib.sha256()
+    for module in sorted(local_imports(script.path)):
+        with open(module, "rb") as f:
+            h.update(os.path.basename(module).encode() + b"\0" + hashlib.sha256(f.read()).digest())
+    h.update(json.dumps([[p, _stat_signature(p)] for p in script.inputs]).encode())
+    for dep in sorted(script.deps):
+        h.update(json.dumps([[p, _output_signature(p)] for p in scripts[dep].outputs]).encode())
+    return h.hexdigest()
+
+
+def load_state(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+# --- build -----------------------------------------------------------------
+
+def run_script(script):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, script.path], cwd=REPO_DIR, capture_output=True, text=True)
+    return proc.returncode, proc.stdout + proc.stderr, time.perf_counter() - start
+
+
+def build_fleet(targets=None, jobs=None, force=False, state_path=DEFAULT_STATE_PATH, on_event=None):
+    """Build ``targets`` (default: everything) plus their dependencies.
+
+    Returns {script name: "built" | "fresh" | "failed" | "skipped"}.
+    """
+    on_event = on_event or (lambda *args: None)
+    scripts = discover()
+    link(scripts)
+
+    wanted, stack = set(), list(targets or scripts)
+    while stack:
+        name = stack.pop()
+        if name not in scripts:
+            raise KeyError(f"No CAPSULE_BUILD definition in {name}")
+        if name not in wanted:
+            wanted.add(name)
+            stack.extend(scripts[name].deps)
+
+    state = load_state(state_path)
+    status = {}
+    pending = set(wanted)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        while pending or running:
+            for name in sorted(pending):
+                script = scripts[name]
+                if any(status.get(dep) in ("failed", "skipped") for dep in script.deps):
+                    status[name] = "skipped"
+                    pending.discard(name)
+                    on_event(name, "skipped", 0.0, "dependency failed")
+                elif all(dep in status for dep in script.deps):
+                    pending.discard(name)
+                    fp = fingerprint(script, scripts)
+                    if not force and state.get(name) == fp and all(os.path.exists(p) for p in script.outputs):
+                        status[name] = "fresh"
+                        on_event(name, "fresh", 0.0, "")
+                    else:
+                        running[pool.submit(run_script, script)] = name
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                returncode, output, seconds = future.result()
+                if returncode == 0:
+                    status[name] = "built"
+                    # Fingerprint after the build: some scripts write into their own inputs.
+                    state[name] = fingerprint(scripts[name], scripts)
+                    save_state(state_path, state)
+                else:
+                    status[name] = "failed"
+                    state.pop(name, None)
+                on_event(name, status[name], seconds, output.strip())
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build all capsules (or TARGETs) in dependency order, in parallel.")
+    parser.add_argument("targets", nargs="*", help="Script names, e.g. Light3_Reflex_Shrine_Healed.py (default: all).")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Concurrent builds (default: one per CPU).")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if nothing changed.")
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH, help="Where to remember what was built.")
+    parser.add_argument("--list", action="store_true", help="Show the capsule definitions and dependencies, then exit.")
+    args = parser.parse_args()
+
+    if args.list:
+        scripts = discover()
+        link(scripts)
+        for script in scripts.values():
+            deps = f"  (after {', '.join(sorted(script.deps))})" if script.deps else ""
+            print(f"📦 {script.name} -> {', '.join(os.path.basename(p) for p in script.outputs)}{deps}")
+        return
+
+    icons = {"built": "✅", "fresh": "⏭", "failed": "❌", "skipped": "⚠️"}
+
+    def on_event(name, status, seconds, output):
+        print(f"{icons[status]} {name}: {status}" + (f" in {seconds:.2f}s" if status == "built" else ""), flush=True)
+        if status in ("failed", "skipped") and output:
+            print("   " + output.replace("\n", "\n   "))
+
+    start = time.perf_counter()
+    status = build_fleet(args.targets or None, args.jobs, args.force, args.state, on_event)
+    counts = {s: sum(1 for v in status.values() if v == s) for s in icons}
+    print(f"\n🚀 Fleet build: {counts['built']} built, {counts['fresh']} up to date, {counts['failed']} failed, "
+          f"{counts['skipped']} skipped in {time.perf_counter() - start:.2f}s")
+    raise SystemExit(1 if counts["failed"] or counts["skipped"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,17 +12,16 @@ import eventlet
 eventlet.monkey_patch()
 
 import os
-import openai
+import json
 import logging
-from flask import Flask, jsonify, request, render_template
-from flask_socketio import SocketIO
+from flask import Flask, Response, jsonify, request, render_template, stream_with_context
+from flask_socketio import SocketIO, join_room, leave_room
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+from llm_backends import LLMError, LLMTimeout, chat_messages, gateway_from_env
 
-# Load the API key from the environment
-openai.api_key = os.getenv("API_KEY_OPENAI", "")
+# Load environment variables (API_KEY_OPENAI, LLM_BACKEND, LLM_TIMEOUT, ...)
+load_dotenv()
 
 # Initialize Flask app and Socket.IO
 app = Flask(__name__)
@@ -32,9 +31,20 @@ socketio = SocketIO(app, cors_allowed_origins="*", async_mode=os.getenv('SOCKETI
 # Set up logging
 logging.basicConfig(level=os.getenv("LOGGING_LEVEL", "INFO"))
 
+# All completions go through one gateway: pooled connections, bounded
+# concurrency and a deadline per request. Background work runs as Socket.IO
+# tasks, so a slow completion never blocks the handler that started it.
+llm = gateway_from_env(spawn=socketio.start_background_task)
+
 # Environment-based feature flags
 FEATURE_BETA = os.getenv('FEATURE_BETA', 'false').lower() == 'true'
 FEATURE_VIP = os.getenv('FEATURE_VIP', 'false').lower() == 'true'
+STREAM_BY_DEFAULT = os.getenv('LLM_STREAM', 'false').lower() == 'true'
+# Replies go to the session that asked; only set this for old overlays that expect every reply broadcast.
+BROADCAST_REPLIES = os.getenv('SOCKETIO_BROADCAST_REPLIES', 'false').lower() == 'true'
+BROADCAST_ROOM = os.getenv('SOCKETIO_BROADCAST_ROOM', 'broadcast')
+# Besides BROADCAST_ROOM, clients may only use rooms named with this prefix (never another session's sid).
+ROOM_PREFIX = 'room:'
 
 # Flask Routes
 @app.route('/')
@@ -73,63 +83,142 @@ def auto_fix():
     return jsonify({"solution": solution})
 
 
+INVALID_MESSAGE = "Request needs a non-empty 'message' string."
+
+
+def user_message(data):
+    """The ``message`` of a chat request if it is a non-empty string, else None."""
+    message = data.get("message") if isinstance(data, dict) else None
+    return message if isinstance(message, str) and message.strip() else None
+
+
 @app.route('/chat', methods=['POST'])
 def chat():
-    message = request.json.get('message')
+    message = user_message(request.get_json(silent=True))
+    if message is None:
+        return jsonify({"error": INVALID_MESSAGE}), 400
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": message}
-            ],
-            temperature=0.5,
-            max_tokens=150
-        )
-        return jsonify({"response": response.choices[0]['message']['content']})
-    except Exception as e:
+        return jsonify({"response": llm.complete(chat_messages(message)).text})
+    except LLMTimeout as e:
+        logging.error(f"GPT request timed out: {e}")
+        return jsonify({"error": "The assistant took too long to respond."}), 504
+    except LLMError as e:
         logging.error(f"GPT request failed: {e}")
         return jsonify({"error": "An error occurred while processing your request."}), 500
 
 
+@app.route('/chat/cache')
+def chat_cache_stats():
+    if llm.cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **llm.cache.stats()})
+
+
+@app.route('/chat/stats')
+def chat_stats():
+    """Upstream calls made versus requests that shared an identical in-flight call."""
+    return jsonify(llm.stats())
+
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Chunked variant of /chat: one JSON object per line, as the tokens arrive."""
+    message = user_message(request.get_json(silent=True))
+    if message is None:
+        return jsonify({"error": INVALID_MESSAGE}), 400
+
+    def events():
+        try:
+            for event in llm.stream(chat_messages(message)):
+                yield json.dumps(event) + "\n"
+        except LLMError as e:
+            logging.error(f"GPT stream failed: {e}")
+            yield json.dumps({"error": "An error occurred while processing your request.",
+                              "timeout": isinstance(e, LLMTimeout)}) + "\n"
+
+    return Response(stream_with_context(events()), mimetype="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 # WebSocket Events
 @socketio.on("connect")
 def handle_connect():
-    logging.info("Client connected")
-    socketio.emit("server_message", {"message": "Socket.IO connection established!"})
+    logging.info(f"Client connected: {request.sid}")
+    socketio.emit("server_message", {"message": "Socket.IO connection established!"}, to=request.sid)
+
+
+def allowed_room(data):
+    """The room named in ``data`` if clients may use it; otherwise tell the sender and return None."""
+    room = (data or {}).get("room", BROADCAST_ROOM)
+    if room == BROADCAST_ROOM or (isinstance(room, str) and room.startswith(ROOM_PREFIX) and len(room) > len(ROOM_PREFIX)):
+        return room
+    socketio.emit("server_message", {"message": f"Room not allowed: {room!r}", "error": "room_not_allowed", "room": room}, to=request.sid)
+    return None
+
+
+@socketio.on("join")
+def handle_join(data):
+    room = allowed_room(data)
+    if room is None:
+        return
+    join_room(room)
+    socketio.emit("server_message", {"message": f"Joined room {room}", "room": room}, to=request.sid)
+
+
+@socketio.on("leave")
+def handle_leave(data):
+    room = allowed_room(data)
+    if room is None:
+        return
+    leave_room(room)
+    socketio.emit("server_message", {"message": f"Left room {room}", "room": room}, to=request.sid)
 
 
 @socketio.on("send_message")
 def handle_message(data):
-    user_message = data.get("message", "")
-    logging.info(f"Message received from client: {user_message}")
+    message = user_message(data)
+    if message is None:
+        socketio.emit("server_message", {"message": INVALID_MESSAGE, "error": "invalid_message"}, to=request.sid)
+        return
+    logging.info(f"Message received from client: {message}")
+    # request.sid isn't available in the background task, so capture the target now
+    target = None if BROADCAST_REPLIES else request.sid
     
-    # Pass the user message to GPT for a response
-    try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": user_message}
-            ],
-            temperature=0.5,
-            max_tokens=150
-        ).choices[0]['message']['content']
-    except Exception as e:
-        logging.error(f"GPT request failed: {e}")
-        response = "An error occurred while processing your request."
-
-    # Send the response back to the client
-    socketio.emit("receive_message", {"response": response})
-    logging.info(f"Sent GPT response: {response}")
+    # Pass the user message to GPT in the background and reply when it's done
+    def on_done(completion, error):
+        if error:
+            logging.error(f"GPT request failed: {error}")
+            response = "An error occurred while processing your request."
+        else:
+            response = completion.text
+        # Send the response back to the client that asked
+        socketio.emit("receive_message", {"response": response}, to=target)
+        logging.info(f"Sent GPT response: {response}")
+
+    if data.get("stream", STREAM_BY_DEFAULT):
+        # Incremental receive_message_chunk events, then the usual receive_message with usage stats
+        def on_event(event):
+            if event.get("done"):
+                socketio.emit("receive_message", event, to=target)
+                logging.info(f"Sent streamed GPT response: {event['response']}")
+            else:
+                socketio.emit("receive_message_chunk", event, to=target)
+
+        llm.submit_stream(chat_messages(message), on_event,
+                          lambda error: on_done(None, error))
+    else:
+        llm.submit(chat_messages(message), on_done)
 
 
 @socketio.on("assistant_response")
 def handle_assistant_response(data):
     assistant_message = data.get("message", "")
     logging.info(f"Assistant sent: {assistant_message}")
-    # Optionally broadcast or log this
-    socketio.emit("server_broadcast", {"response": assistant_message})
+    # Broadcast to the named room (clients subscribe with the "join" event)
+    room = allowed_room(data)
+    if room is None:
+        return
+    socketio.emit("server_broadcast", {"response": assistant_message, "room": room}, to=room)
 
 
 # Assistants
@@ -153,20 +242,11 @@ class SmartFixerAssistant:
     def request_fix(self, issue_log):
         prompt = f"Help solve this issue: {issue_log}"
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.5,
-                max_tokens=150
-            )
-            solution = response.choices[0]['message']['content']
+            solution = llm.complete(chat_messages(prompt)).text
             logging.info(f"Suggested solution: {solution}")
             self.unlock_features(solution)
             return solution
-        except Exception as e:
+        except LLMError as e:
             logging.error(f"Error during GPT request: {e}")
             return None
 
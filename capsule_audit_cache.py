@@ -0,0 +1,144 @@
+"""Persistent audit cache so unchanged capsules are not re-audited.
+
+Results are keyed by the capsule's SHA-256 plus a fingerprint of the
+auditor itself (version string, KNOWN_PERMISSIONS, injected defaults, the
+active manifest rule file and the source of every local module the
+auditor imports, repack and seal included), so editing any repair rule,
+the permission list or the code that writes repaired capsules invalidates
+every cached entry automatically. A verdict also records the sealed digest
+of the repaired capsule it produced; it is only reused while the artifact
+on disk still carries that digest. GPT assist
+replies are cached here too, keyed by (endpoint, prompt, capsule hash).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import capsule_audit_utils as cau
+import capsule_manifest_rules
+from build_fleet import local_imports
+from capsule_seal import hash_file, read_sig, sig_path_for
+
+AUDITOR_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "capsule_auditor.py")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS verdicts (
+    capsule_sha256 TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    dry_run INTEGER NOT NULL,
+    summary TEXT NOT NULL,
+    repaired_sha256 TEXT,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (capsule_sha256, fingerprint, dry_run)
+);
+CREATE TABLE IF NOT EXISTS gpt_responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+"""
+
+
+def default_cache_path(output_dir=None):
+    output_dir = os.path.abspath(output_dir or cau.AUDITOR_OUTPUT_DIR)
+    return os.path.join(os.path.dirname(output_dir), "audit_cache.sqlite")
+
+
+def rules_fingerprint():
+    h = hashlib.sha256()
+    h.update(cau.AUDITOR_VERSION.encode())
+    h.update(json.dumps(sorted(cau.KNOWN_PERMISSIONS)).encode())
+    h.update(json.dumps([cau.DEFAULT_PERSONALITY, cau.DEFAULT_GPT_HOOK], sort_keys=True).encode())
+    for path in sorted(local_imports(AUDITOR_SCRIPT)) + [capsule_manifest_rules.rules_path()]:
+        h.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+class AuditCache:
+    def __init__(self, path=None):
+        self.path = path or default_cache_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript(SCHEMA)
+        self.fingerprint = rules_fingerprint()
+        self.hits = self.misses = 0
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def capsule_digest(self, path):
+        # Re-hash only when size or mtime moved since the last run.
+        st = os.stat(path)
+        key = os.path.abspath(path)
+        row = self.conn.execute(
+            "SELECT sha256 FROM file_hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (key, st.st_size, st.st_mtime_ns)).fetchone()
+        if row:
+            return row[0]
+        digest = hash_file(path)
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+                              (key, st.st_size, st.st_mtime_ns, digest))
+        return digest
+
+    def lookup(self, path, dry_run, output_dir):
+        started = time.perf_counter()
+        digest = self.capsule_digest(path)
+        row = self.conn.execute(
+            "SELECT summary, repaired_sha256 FROM verdicts WHERE capsule_sha256 = ? AND fingerprint = ? AND dry_run = ?",
+            (digest, self.fingerprint, int(dry_run))).fetchone()
+        if row:
+            # The verdict depends only on the bytes; names and paths come from the
+            # capsule being looked up, since identical capsules can live under several names.
+            summary, repaired_sha256 = row
+            capsule_key = f"{cau.capsule_stem(path)}_REPAIRED.camp"
+            repaired_path = None if dry_run else os.path.join(output_dir, capsule_key)
+            # The artifact under that name must be the one this verdict produced,
+            # not a repair of some other version of the capsule.
+            if dry_run or (repaired_sha256 and self._sealed_digest(repaired_path) == repaired_sha256):
+                self.hits += 1
+                stats = {"elapsed_ms": round((time.perf_counter() - started) * 1000, 3), "cached": True, "sha256": digest}
+                return capsule_key, json.loads(summary), repaired_path, stats
+        self.misses += 1
+        return None
+
+    @staticmethod
+    def _sealed_digest(path):
+        try:
+            return read_sig(sig_path_for(path))
+        except (OSError, ValueError):
+            return None
+
+    def store(self, path, dry_run, result):
+        summary, repaired_path = result[1], result[2]
+        digest = self.capsule_digest(path)
+        repaired_sha256 = self._sealed_digest(repaired_path) if repaired_path else None
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, self.fingerprint, int(dry_run), json.dumps(summary), repaired_sha256, time.time()))
+        return digest
+
+    def get_gpt_response(self, key):
+        row = self.conn.execute("SELECT response FROM gpt_responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put_gpt_response(self, key, response):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO gpt_responses VALUES (?, ?, ?)", (key, response, time.time()))
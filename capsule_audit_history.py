@@ -0,0 +1,167 @@
+"""Append-only SQLite history of capsule audit runs.
+
+capsule_auditor.py records every run and each capsule's result (score,
+unknown permissions, file count, timing), so trends can be queried later
+without rescanning any archive:
+
+    python capsule_audit_history.py runs
+    python capsule_audit_history.py history Operator_MindCapsule_REPAIRED.camp
+    python capsule_audit_history.py regressions [--run ID]
+    python capsule_audit_history.py top-risk [-n 10] [--run ID]
+
+Every query is answered from an index, so a year of nightly runs stays
+in the millisecond range.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+import capsule_audit_utils as cau
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    base_dir TEXT NOT NULL,
+    dry_run INTEGER NOT NULL,
+    auditor_version TEXT NOT NULL,
+    capsules INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    capsule TEXT NOT NULL,
+    sha256 TEXT,
+    score INTEGER NOT NULL,
+    unknown_permissions TEXT NOT NULL,
+    unknown_count INTEGER NOT NULL,
+    files INTEGER NOT NULL,
+    elapsed_ms REAL,
+    cached INTEGER NOT NULL,
+    repaired_path TEXT,
+    PRIMARY KEY (run_id, capsule)
+);
+CREATE INDEX IF NOT EXISTS results_capsule_run ON results (capsule, run_id);
+CREATE INDEX IF NOT EXISTS results_run_score ON results (run_id, score);
+"""
+
+
+def default_history_path(output_dir=None):
+    output_dir = os.path.abspath(output_dir or cau.AUDITOR_OUTPUT_DIR)
+    return os.path.join(os.path.dirname(output_dir), "audit_history.sqlite")
+
+
+class AuditHistory:
+    def __init__(self, path=None):
+        self.path = path or default_history_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- recording ---------------------------------------------------------
+
+    def start_run(self, base_dir, dry_run):
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO runs (started_at, base_dir, dry_run, auditor_version) VALUES (?, ?, ?, ?)",
+                (time.time(), os.path.abspath(base_dir), int(dry_run), cau.AUDITOR_VERSION))
+        return cur.lastrowid
+
+    def record(self, run_id, capsule_key, summary, repaired_path, stats):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, capsule_key, stats.get("sha256"), summary["score"],
+                 json.dumps(summary["unknown_permissions"]), len(summary["unknown_permissions"]),
+                 summary["files"], stats.get("elapsed_ms"), int(stats.get("cached", False)), repaired_path))
+
+    def finish_run(self, run_id):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE runs SET finished_at = ?, capsules = (SELECT COUNT(*) FROM results WHERE run_id = ?) "
+                "WHERE id = ?", (time.time(), run_id, run_id))
+
+    # --- queries -----------------------------------------------------------
+
+    def runs(self, limit=20):
+        return self.conn.execute(
+            "SELECT id, datetime(started_at, 'unixepoch') AS started, ROUND(finished_at - started_at, 2) AS seconds, "
+            "base_dir, dry_run, capsules FROM runs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+
+    def latest_run_id(self):
+        row = self.conn.execute("SELECT MAX(id) FROM runs WHERE finished_at IS NOT NULL").fetchone()
+        return row[0]
+
+    def history(self, capsule, limit=30):
+        return self.conn.execute(
+            "SELECT r.run_id, datetime(runs.started_at, 'unixepoch') AS started, r.score, r.unknown_permissions, r.files, r.elapsed_ms, r.sha256 "
+            "FROM results r JOIN runs ON runs.id = r.run_id "
+            "WHERE r.capsule = ? ORDER BY r.run_id DESC LIMIT ?", (capsule, limit)).fetchall()
+
+    def top_risk(self, limit=10, run_id=None):
+        run_id = run_id or self.latest_run_id()
+        return self.conn.execute(
+            "SELECT capsule, score, unknown_permissions, files FROM results "
+            "WHERE run_id = ? ORDER BY score ASC, unknown_count DESC LIMIT ?", (run_id, limit)).fetchall()
+
+    def regressions(self, run_id=None):
+        """Capsules whose score dropped since the previous run that audited them."""
+        run_id = run_id or self.latest_run_id()
+        return self.conn.execute(
+            "SELECT cur.capsule, prev.run_id AS previous_run, prev.score AS previous_score, cur.score AS score "
+            "FROM results cur JOIN results prev ON prev.capsule = cur.capsule AND prev.run_id = ("
+            "    SELECT MAX(run_id) FROM results p WHERE p.capsule = cur.capsule AND p.run_id < cur.run_id) "
+            "WHERE cur.run_id = ? AND cur.score < prev.score "
+            "ORDER BY cur.score - prev.score ASC", (run_id,)).fetchall()
+
+
+def _print_rows(rows):
+    if not rows:
+        print("(no rows)")
+        return
+    columns = rows[0].keys()
+    widths = [max(len(str(c)), *(len(str(row[c])) for row in rows)) for c in columns]
+    print("  ".join(str(c).ljust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row[c]).ljust(w) for c, w in zip(columns, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the capsule audit history.")
+    parser.add_argument("--db", default=None, help="History database (default: next to the audit output dir).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("runs", help="List recent audit runs.")
+    p_history = sub.add_parser("history", help="Score history of one capsule.")
+    p_history.add_argument("capsule")
+    p_regressions = sub.add_parser("regressions", help="Capsules whose score dropped.")
+    p_regressions.add_argument("--run", type=int, default=None)
+    p_top = sub.add_parser("top-risk", help="Lowest-scoring capsules.")
+    p_top.add_argument("-n", type=int, default=10)
+    p_top.add_argument("--run", type=int, default=None)
+    args = parser.parse_args()
+
+    with AuditHistory(args.db) as history:
+        if args.command == "runs":
+            _print_rows(history.runs())
+        elif args.command == "history":
+            _print_rows(history.history(args.capsule))
+        elif args.command == "regressions":
+            _print_rows(history.regressions(args.run))
+        else:
+            _print_rows(history.top_risk(args.n, args.run))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
-import os, zipfile, json, shutil, yaml, hashlib
-from pathlib import Path
+import os, io, zipfile, json, itertools, posixpath
+from capsule_gpt_assist import GPTAssistClient, default_client
+from capsule_manifest_rules import load_rules
+from capsule_profile import CountingReader, StageTimer
+from capsule_seal import SealedZip, hash_file, make_seal, write_seal
+from capsule_zip import repack_into
 
 AUDITOR_OUTPUT_DIR = "/mnt/data/audited_capsules"
-os.makedirs(AUDITOR_OUTPUT_DIR, exist_ok=True)
+AUDITOR_VERSION = "Agent0 Auditor v1.0"
 
 KNOWN_PERMISSIONS = {
     "tabs", "activeTab", "storage", "scripting", "microphone", "camera",
@@ -24,89 +28,306 @@ DEFAULT_GPT_HOOK = {
     "fallback_prompt": "Describe any problems in this capsule."
 }
 
-def gpt_assist(prompt, url="http://localhost:11434/gpt"):
-    try:
-        import requests
-        res = requests.post(url, json={"prompt": prompt})
-        return res.json().get("response", "No reply.")
-    except Exception as e:
-        return f"[GPT Error] {e}"
+DEFAULT_ASSIST_PROMPT = "Why did this capsule fail validation?"
+
+# PyYAML is imported on first use (it is the slowest import on the CLI's
+# startup path) and its libyaml-backed loader/dumper are used when built in.
+def yaml_load(data):
+    import yaml
+    return yaml.load(data, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+def yaml_dump(data):
+    import yaml
+    return yaml.dump(data, Dumper=getattr(yaml, "CDumper", yaml.Dumper))
+
+def gpt_assist(prompt, url="http://localhost:11434/gpt", capsule_sha=None):
+    return default_client().ask(prompt, url, capsule_sha)
+
+def assist_request(zip_ref, index):
+    assist_path = index.find("agent_assist.yaml")
+    if not assist_path:
+        return None
+    assist = yaml_load(zip_ref.read(assist_path)).get("agent_assist", {})
+    if assist.get("enabled") and "gpt_id" in assist:
+        return assist["gpt_id"], assist.get("prompt", DEFAULT_ASSIST_PROMPT), assist.get("help_url", "http://localhost:11434/gpt")
+    return None
+
+def prefetch_gpt_notes(paths, client, digest=hash_file):
+    # Ask the assist endpoint for every capsule up front, concurrently,
+    # so the per-capsule audits never wait on a round-trip.
+    pending = {}
+    for path in paths:
+        try:
+            with zipfile.ZipFile(path, "r") as zip_ref:
+                request = assist_request(zip_ref, CapsuleIndex.from_zip(zip_ref))
+        except Exception:
+            continue  # the audit itself reports the broken capsule
+        if request:
+            _, prompt, url = request
+            pending[path] = (prompt, url, digest(path))
+    return client.ask_many(pending) if pending else {}
+
+def failed_audit(full_path, error):
+    # Result for a capsule that could not be audited (not a zip, unreadable,
+    # malformed YAML...). It scores 0 so it tops the risk queries, and the run
+    # carries on with the other capsules.
+    summary = {"score": 0, "unknown_permissions": [], "findings": [], "files": 0, "repaired": False,
+               "error": f"{type(error).__name__}: {error}"}
+    return f"{capsule_stem(full_path)}_REPAIRED.camp", summary, None, {"elapsed_ms": 0.0, "cached": False}
+
+def capsule_stem(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+def list_capsules(base_dir="/mnt/data"):
+    return sorted(os.path.join(base_dir, fname) for fname in os.listdir(base_dir) if fname.endswith((".zip", ".camp")))
+
+def scan_and_repair_capsules(base_dir="/mnt/data", dry_run=False, jobs=1, on_result=None, output_dir=None, cache=None,
+                             gpt_client=None, profile_dir=None):
+    return audit_capsules(list_capsules(base_dir), dry_run, jobs, on_result, output_dir, cache, gpt_client, profile_dir)
+
+def audit_capsules(capsules, dry_run=False, jobs=1, on_result=None, output_dir=None, cache=None,
+                   gpt_client=None, profile_dir=None):
+    # on_result(capsule_key, summary, repaired_path, stats) sees each capsule
+    # as soon as it finishes; the returned list and summaries are always
+    # merged in input order (list_capsules sorts). For runs too large to
+    # hold in memory, consume iter_capsule_audits directly instead.
+    capsules = list(capsules)
+    results = {}
+    for path, result in iter_capsule_audits(capsules, dry_run, jobs, output_dir, cache, gpt_client, profile_dir):
+        results[path] = result
+        if on_result:
+            on_result(*result)
 
-def scan_and_repair_capsules(base_dir="/mnt/data", dry_run=False):
     repaired_files, summaries = [], {}
-    for fname in os.listdir(base_dir):
-        if fname.endswith((".zip", ".camp")):
-            full_path = os.path.join(base_dir, fname)
-            capsule_name = Path(fname).stem
-            extract_dir = os.path.join(base_dir, f"extracted_{capsule_name}")
-            shutil.rmtree(extract_dir, ignore_errors=True)
-            os.makedirs(extract_dir, exist_ok=True)
-
-            with zipfile.ZipFile(full_path, "r") as zip_ref:
-                zip_ref.extractall(extract_dir)
-
-            manifest_path = find_file(extract_dir, "manifest.json")
-            reflect_path = find_file(extract_dir, "reflect.yaml")
-            assist_path = find_file(extract_dir, "agent_assist.yaml")
-            personality_path = find_file(extract_dir, "agent_personality.yaml")
-            audit_log = os.path.join(extract_dir, "repair.log")
-
-            with open(audit_log, "w") as log:
-                log.write("Capsule Repair Summary:\n")
-                score, unknown_perms = {"manifest_integrity": 100, "permission_risk": "low", "total": 100}, []
-
-                if manifest_path:
-                    score, unknown_perms = repair_and_validate_manifest(manifest_path, extract_dir, log, dry_run)
-                if not reflect_path:
-                    reflect_path = os.path.join(extract_dir, "reflect.yaml")
-                    write_reflect_yaml(reflect_path, extract_dir, dry_run, score)
-                else:
-                    regenerate_reflect_yaml(reflect_path, extract_dir, dry_run, score)
-
-                if not personality_path:
-                    with open(os.path.join(extract_dir, "agent_personality.yaml"), "w") as pfile:
-                        yaml.dump(DEFAULT_PERSONALITY, pfile)
-                    log.write("🧠 Injected default agent_personality.yaml\n")
-
-                # 🤖 GPT Suggestion via agent_assist.yaml
-                if assist_path:
-                    with open(assist_path) as f:
-                        assist = yaml.safe_load(f).get("agent_assist", {})
-                        if assist.get("enabled") and "gpt_id" in assist:
-                            note = gpt_assist("Why did this capsule fail validation?", assist.get("help_url", "http://localhost:11434/gpt"))
-                            log.write(f"\n🧠 GPT Suggestion ({assist['gpt_id']}): {note}\n")
-
-                summary = {
-                    "score": score["total"],
-                    "unknown_permissions": unknown_perms,
-                    "files": count_files(extract_dir),
-                    "repaired": not dry_run
-                }
-
-                summaries[f"{capsule_name}_REPAIRED.camp"] = summary
-                with open(os.path.join(extract_dir, "audit_summary.json"), "w") as f:
-                    json.dump(summary, f, indent=2)
-
-                log.write(f"\n⭐ Score: {score['total']}/100\n")
-
-            if not dry_run:
-                repaired_path = os.path.join(AUDITOR_OUTPUT_DIR, f"{capsule_name}_REPAIRED.camp")
-                with zipfile.ZipFile(repaired_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for root, _, files in os.walk(extract_dir):
-                        for file in files:
-                            full_file = os.path.join(root, file)
-                            arcname = os.path.relpath(full_file, start=extract_dir)
-                            zipf.write(full_file, arcname=arcname)
-                repaired_files.append(repaired_path)
-
-                # Hash it
-                with open(repaired_path, "rb") as f, open(repaired_path + ".sig", "w") as sig:
-                    sha = hashlib.sha256(f.read()).hexdigest()
-                    sig.write(f"{sha}  {os.path.basename(repaired_path)}")
-
-            shutil.rmtree(extract_dir)
+    for path in capsules:
+        capsule_key, summary, repaired_path, _ = results[path]
+        summaries[capsule_key] = summary
+        if repaired_path:
+            repaired_files.append(repaired_path)
     return repaired_files, summaries
 
+def iter_capsule_audits(capsules, dry_run=False, jobs=1, output_dir=None, cache=None, gpt_client=None,
+                        profile_dir=None, batch_size=64):
+    # Yields (path, (capsule_key, summary, repaired_path, stats)) for each
+    # capsule as soon as it is done. Capsules are independent, so with
+    # jobs > 1 they fan out over a process pool. Cache lookups and the GPT
+    # prefetch consume the iterable batch_size capsules at a time, and at
+    # most batch_size audits are in flight; the window is refilled as each
+    # one completes, so workers never wait for a whole batch to drain and
+    # memory stays flat however many capsules there are.
+    # With an AuditCache, unchanged capsules are answered from the cache.
+    # profile_dir adds a cProfile dump per audited capsule.
+    output_dir = output_dir or AUDITOR_OUTPUT_DIR
+    own_client = gpt_client is None
+    gpt_client = gpt_client or GPTAssistClient(cache=cache)
+    digest = cache.capsule_digest if cache else hash_file
+    capsules = iter(capsules)
+
+    def prepared():
+        # (path, cached result or None, prefetched GPT note)
+        while True:
+            batch = list(itertools.islice(capsules, batch_size))
+            if not batch:
+                return
+            pending = []
+            for path in batch:
+                cached = cache.lookup(path, dry_run, output_dir) if cache else None
+                if cached:
+                    yield path, cached, None
+                else:
+                    pending.append(path)
+            notes = prefetch_gpt_notes(pending, gpt_client, digest)
+            for path in pending:
+                yield path, None, notes.get(path)
+
+    def finished(path, result):
+        if cache and "error" not in result[1]:
+            result[3]["sha256"] = cache.store(path, dry_run, result)
+        return path, result
+
+    pool, in_flight = None, {}
+
+    def drain(block):
+        from concurrent.futures import FIRST_COMPLETED, wait
+        done, _ = wait(in_flight, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            path = in_flight.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                result = failed_audit(path, e)
+            yield finished(path, result)
+
+    try:
+        for path, cached, note in prepared():
+            if cached:
+                yield path, cached
+            elif jobs == 1:
+                try:
+                    result = audit_capsule(path, dry_run, output_dir, note, profile_dir)
+                except Exception as e:
+                    result = failed_audit(path, e)
+                yield finished(path, result)
+            else:
+                if pool is None:
+                    from concurrent.futures import ProcessPoolExecutor
+                    pool = ProcessPoolExecutor(max_workers=jobs or None)
+                in_flight[pool.submit(audit_capsule, path, dry_run, output_dir, note, profile_dir)] = path
+                yield from drain(block=len(in_flight) >= batch_size)
+        while in_flight:
+            yield from drain(block=True)
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+        if own_client:
+            gpt_client.close()
+
+def audit_capsule(full_path, dry_run=False, output_dir=None, gpt_note=None, profile_dir=None):
+    # Everything is read straight from the archive; only entries that change are
+    # kept in memory (``changes``) and written out when the capsule is repacked.
+    if profile_dir:
+        import cProfile
+        profiler = cProfile.Profile()
+        result = profiler.runcall(audit_capsule, full_path, dry_run, output_dir, gpt_note)
+        os.makedirs(profile_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(profile_dir, f"{capsule_stem(full_path)}.prof"))
+        return result
+
+    timer = StageTimer()
+    capsule_name = capsule_stem(full_path)
+    changes, repaired_path = {}, None
+
+    with open(full_path, "rb") as raw, zipfile.ZipFile(CountingReader(raw), "r") as zip_ref:
+        with timer.stage("index"):
+            index = CapsuleIndex.from_zip(zip_ref)
+            manifest_path = index.find("manifest.json")
+            reflect_path = index.find("reflect.yaml")
+            personality_path = index.find("agent_personality.yaml")
+
+        log = io.StringIO()
+        log.write("Capsule Repair Summary:\n")
+        score, unknown_perms, findings = {"manifest_integrity": 100, "permission_risk": "low", "total": 100}, [], []
+
+        with timer.stage("manifest"):
+            if manifest_path:
+                score, unknown_perms, findings = repair_and_validate_manifest(zip_ref, manifest_path, index, log, dry_run, changes)
+        with timer.stage("reflect"):
+            if not reflect_path:
+                write_reflect_yaml("reflect.yaml", index, dry_run, score, changes)
+            else:
+                regenerate_reflect_yaml(reflect_path, index, dry_run, score, changes)
+
+            if not personality_path:
+                changes["agent_personality.yaml"] = yaml_dump(DEFAULT_PERSONALITY)
+                log.write("🧠 Injected default agent_personality.yaml\n")
+
+        # 🤖 GPT Suggestion via agent_assist.yaml (normally prefetched by the scan)
+        with timer.stage("assist"):
+            assist = assist_request(zip_ref, index)
+            if assist:
+                gpt_id, prompt, url = assist
+                note = gpt_note if gpt_note is not None else gpt_assist(prompt, url)
+                log.write(f"\n🧠 GPT Suggestion ({gpt_id}): {note}\n")
+
+        summary = {
+            "score": score["total"],
+            "unknown_permissions": unknown_perms,
+            "findings": findings,
+            "files": index.count_with(list(changes) + ["repair.log"]),
+            "repaired": not dry_run
+        }
+
+        changes["audit_summary.json"] = json.dumps(summary, indent=2)
+        log.write(f"\n⭐ Score: {score['total']}/100\n")
+        changes["repair.log"] = log.getvalue()
+
+        if not dry_run:
+            output_dir = output_dir or AUDITOR_OUTPUT_DIR
+            os.makedirs(output_dir, exist_ok=True)
+            repaired_path = os.path.join(output_dir, f"{capsule_name}_REPAIRED.camp")
+            # Hashed while it is written, so the archive is never read back.
+            with timer.stage("repack"):
+                sealer = SealedZip(repaired_path)
+                with sealer as zipf:
+                    written = repack_into(zip_ref, zipf, changes)
+            with timer.stage("seal"):
+                write_seal(repaired_path, make_seal(repaired_path, written))
+            timer.count("bytes_written", sealer.size)
+
+        timer.count("bytes_read", zip_ref.fp.bytes_read)
+        timer.count("entries", len(index))
+        timer.count("changed_entries", len(changes))
+
+    stats = {"elapsed_ms": timer.elapsed_ms(), "cached": False, "profile": timer.as_dict()}
+    return f"{capsule_name}_REPAIRED.camp", summary, repaired_path, stats
+
+class CapsuleIndex:
+    """One-pass index of a capsule's file entries.
+
+    Built from the zip central directory (or a single ``os.walk`` of an
+    unpacked capsule) so every audit stage can answer lookups without
+    rescanning the archive.
+    """
+
+    def __init__(self):
+        self.paths = set()
+        self.dirs = set()
+        self.by_name = {}
+        self.by_ext = {}
+        self.sizes = {}
+        self.total_size = 0
+
+    @classmethod
+    def from_zip(cls, zip_ref):
+        index = cls()
+        for info in zip_ref.infolist():
+            if not info.is_dir():
+                index.add(info.filename, info.file_size)
+        return index
+
+    @classmethod
+    def from_directory(cls, root_dir):
+        index = cls()
+        for root, _, files in os.walk(root_dir):
+            for file in files:
+                full = os.path.join(root, file)
+                index.add(os.path.relpath(full, start=root_dir).replace(os.sep, "/"), os.path.getsize(full))
+        return index
+
+    def add(self, path, size=0):
+        if path in self.paths:
+            return
+        self.paths.add(path)
+        self.sizes[path] = size
+        self.total_size += size
+        self.by_name.setdefault(posixpath.basename(path), []).append(path)
+        self.by_ext.setdefault(posixpath.splitext(path)[1], []).append(path)
+        parent = posixpath.dirname(path)
+        while parent and parent not in self.dirs:
+            self.dirs.add(parent)
+            parent = posixpath.dirname(parent)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __contains__(self, path):
+        return path in self.paths
+
+    def find(self, filename):
+        # Mirrors the old top-down os.walk lookup: the shallowest match wins.
+        matches = self.by_name.get(filename)
+        return min(matches, key=lambda path: (path.count("/"), path)) if matches else None
+
+    def exists(self, relpath):
+        key = posixpath.normpath(relpath.replace("\\", "/")).lstrip("/")
+        return key in self.paths or key in self.dirs
+
+    def with_ext(self, *exts):
+        return sorted(path for ext in exts for path in self.by_ext.get(ext, ()))
+
+    def count_with(self, extra):
+        return len(self.paths) + sum(1 for path in set(extra) if path not in self.paths)
+
 def count_files(root_dir):
     return sum(len(files) for _, _, files in os.walk(root_dir))
 
@@ -116,88 +337,70 @@ def find_file(root_dir, filename):
             return os.path.join(root, filename)
     return None
 
-def repair_and_validate_manifest(manifest_path, base_dir, log, dry_run):
-    unknown_perms, score = [], {"manifest_integrity": 100, "permission_risk": "low", "total": 100}
-    with open(manifest_path, "r", encoding="utf-8") as f:
-        try:
-            manifest = json.load(f)
-        except json.JSONDecodeError as e:
-            log.write(f"❌ JSON error: {e}\n")
-            score["manifest_integrity"] = 0
-            score["total"] -= 30
-            return score, unknown_perms
-
-    required_fields = ["name", "version", "manifest_version"]
-    defaults = {
-        "name": "Operator Extension",
-        "version": "1.0",
-        "manifest_version": 3,
-        "permissions": [],
-        "background": {"service_worker": "background.js"}
-    }
-
-    for key in required_fields:
-        if key not in manifest:
-            manifest[key] = defaults[key]
-            log.write(f"⚠️ Missing key '{key}' filled.\n")
-            score["manifest_integrity"] -= 10
-            score["total"] -= 10
-
-    permissions = manifest.get("permissions", [])
-    for perm in permissions:
-        if perm not in KNOWN_PERMISSIONS:
-            unknown_perms.append(perm)
-            score["permission_risk"] = "medium"
-            score["total"] -= 5
-
-    def validate_file(relpath, label):
-        full = os.path.join(base_dir, relpath)
-        if not os.path.exists(full):
-            log.write(f"❌ {label} missing: {relpath}\n")
-            score["total"] -= 5
-        else:
-            log.write(f"✅ {label} found: {relpath}\n")
-
-    if "content_scripts" in manifest:
-        for cs in manifest["content_scripts"]:
-            for js in cs.get("js", []):
-                validate_file(js, "Content Script")
-
-    if "background" in manifest and "service_worker" in manifest["background"]:
-        validate_file(manifest["background"]["service_worker"], "Service Worker")
-
-    if "action" in manifest and "default_popup" in manifest["action"]:
-        validate_file(manifest["action"]["default_popup"], "Popup HTML")
-
-    manifest["repaired_by"] = "Agent0 Auditor v1.0"
+def repair_and_validate_manifest(zip_ref, manifest_path, index, log, dry_run, changes, rules=None):
+    # The checks themselves come from the declarative rule set in
+    # manifest_rules.yaml; failures are logged and returned as findings.
+    unknown_perms, findings = [], []
+    score = {"manifest_integrity": 100, "permission_risk": "low", "total": 100}
+    try:
+        manifest = json.loads(zip_ref.read(manifest_path).decode("utf-8"))
+    except json.JSONDecodeError as e:
+        log.write(f"❌ JSON error: {e}\n")
+        score["manifest_integrity"] = 0
+        score["total"] -= 30
+        findings.append({"rule": "manifest_json", "severity": "error", "field": None, "path": None, "message": str(e)})
+        return score, unknown_perms, findings
+
+    rules = rules or load_rules()
+
+    for key in rules.missing_fields(manifest):
+        manifest[key] = rules.required_defaults[key]
+        log.write(f"⚠️ Missing key '{key}' filled.\n")
+        score["manifest_integrity"] -= rules.required_penalty
+        score["total"] -= rules.required_penalty
+        findings.append({"rule": "required", "severity": "error", "field": key, "path": None, "message": f"Missing key '{key}' filled"})
+
+    for perm in rules.unknown_permissions(manifest, KNOWN_PERMISSIONS):
+        unknown_perms.append(perm)
+        score["permission_risk"] = rules.permission_risk
+        score["total"] -= rules.permission_penalty
+
+    for field, pattern in rules.invalid_host_patterns(manifest):
+        log.write(f"⚠️ Invalid host pattern in {field}: {pattern}\n")
+        score["total"] -= rules.host_penalty
+        findings.append({"rule": "host_permissions", "severity": rules.host_severity, "field": field, "path": None,
+                         "message": f"Invalid match pattern: {pattern}"})
+
+    for rule, field, relpath, found in rules.check_files(manifest, index, posixpath.dirname(manifest_path)):
+        if found:
+            log.write(f"✅ {rule.label} found: {relpath}\n")
+            continue
+        log.write(f"{'❌' if rule.severity == 'error' else '⚠️'} {rule.label} missing: {relpath}\n")
+        score["total"] -= rule.penalty
+        findings.append({"rule": rule.id, "severity": rule.severity, "field": field, "path": relpath,
+                         "message": f"{rule.label} missing: {relpath}"})
+
+    manifest["repaired_by"] = AUDITOR_VERSION
 
     if not dry_run:
-        with open(manifest_path, "w", encoding="utf-8") as f:
-            json.dump(manifest, f, indent=2)
+        changes[manifest_path] = json.dumps(manifest, indent=2)
 
-    return score, unknown_perms
+    return score, unknown_perms, findings
 
-def regenerate_reflect_yaml(reflect_path, root_dir, dry_run, score):
-    discovered = []
-    for root, _, files in os.walk(root_dir):
-        for file in files:
-            if file.endswith((".js", ".html", ".py")):
-                rel = os.path.relpath(os.path.join(root, file), start=root_dir)
-                discovered.append(rel)
+def regenerate_reflect_yaml(reflect_path, index, dry_run, score, changes):
+    discovered = index.with_ext(".js", ".html", ".py")
 
     data = {
         "capsule": "Auto-Repaired Reflex Capsule",
         "files": discovered,
         "repaired": True,
-        "repaired_by": "Agent0 Auditor v1.0",
+        "repaired_by": AUDITOR_VERSION,
         "score": score,
         "gpt_hook": DEFAULT_GPT_HOOK
     }
 
     if not dry_run:
-        with open(reflect_path, "w") as f:
-            yaml.dump(data, f)
-
-def write_reflect_yaml(reflect_path, root_dir, dry_run, score):
-    regenerate_reflect_yaml(reflect_path, root_dir, dry_run, score)
+        changes[reflect_path] = yaml_dump(data)
 
+def write_reflect_yaml(reflect_path, index, dry_run, score, changes):
+    regenerate_reflect_yaml(reflect_path, index, dry_run, score, changes)
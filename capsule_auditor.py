@@ -1,18 +1,123 @@
 import argparse
+import heapq
+import itertools
 import json
 import os
-from capsule_audit_utils import scan_and_repair_capsules, AUDITOR_OUTPUT_DIR
+import sys
+from capsule_audit_utils import iter_capsule_audits, list_capsules, AUDITOR_OUTPUT_DIR
+from capsule_audit_cache import AuditCache
+from capsule_audit_history import AuditHistory
+from capsule_gpt_assist import GPTAssistClient
+from capsule_profile import merge_profiles, slowest_table
+
+BASE_DIR = "/mnt/data"
+
+
+def print_result(capsule_key, summary, repaired_path, stats, file=None):
+    if "error" in summary:
+        print(f"❌ {capsule_key}: audit failed: {summary['error']}", file=file, flush=True)
+        return
+    print(f"🔍 {capsule_key}: score {summary['score']}/100, {summary['files']} files"
+          + (f", unknown permissions: {', '.join(summary['unknown_permissions'])}" if summary["unknown_permissions"] else "")
+          + (" (cached)" if stats.get("cached") else f" ({stats['elapsed_ms']:.0f} ms)"),
+          file=file, flush=True)
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Audit and repair AI capsules.")
     parser.add_argument("--audit-only", action="store_true", help="Dry run: only audit, don't modify or repackage.")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Audit capsules in N worker processes (0 = one per CPU).")
+    parser.add_argument("--no-cache", action="store_true", help="Re-audit every capsule, ignoring the audit cache.")
+    parser.add_argument("--no-history", action="store_true", help="Don't record this run in the audit history database.")
+    parser.add_argument("--profile", metavar="DIR", help="Write a cProfile dump per audited capsule (plus a merged audit.prof) to DIR.")
+    parser.add_argument("--top", type=int, default=5, help="Show the N slowest capsules with per-stage timings (0 = off).")
+    parser.add_argument("--watch", action="store_true", help="After the initial run, keep watching for new or changed capsules.")
+    parser.add_argument("--settle", type=float, default=0.3, help="Seconds a capsule must stay unchanged before it is audited in --watch mode.")
+    parser.add_argument("--jsonl", metavar="PATH", help="Stream one JSON result per line to PATH ('-' for stdout) instead of "
+                                                         "collecting audit_summary_all.json; memory stays flat for any number of capsules.")
     args = parser.parse_args()
 
-    repaired, summary = scan_and_repair_capsules(dry_run=args.audit_only)
+    cache = None if args.no_cache else AuditCache()
+    history = None if args.no_history else AuditHistory()
+    run_id = history.start_run(BASE_DIR, args.audit_only) if history else None
+    gpt_client = GPTAssistClient(cache=cache)
+
+    console = sys.stderr if args.jsonl == "-" else None
+    jsonl = (sys.stdout if args.jsonl == "-" else open(args.jsonl, "w", encoding="utf-8")) if args.jsonl else None
+    repaired, summary = [], {}
+    slowest, seq = [], itertools.count()  # bounded min-heap of the --top slowest audits
+
+    def on_result(capsule_key, capsule_summary, repaired_path, stats):
+        print_result(capsule_key, capsule_summary, repaired_path, stats, file=console)
+        if args.top and not stats.get("cached") and "error" not in capsule_summary:
+            heapq.heappush(slowest, (stats["elapsed_ms"], next(seq), (capsule_key, None, None, stats)))
+            if len(slowest) > args.top:
+                heapq.heappop(slowest)
+        if history:
+            history.record(run_id, capsule_key, capsule_summary, repaired_path, stats)
+        if jsonl:
+            jsonl.write(json.dumps({"capsule": capsule_key, **capsule_summary, "repaired_path": repaired_path, "stats": stats}) + "\n")
+            jsonl.flush()
+        else:
+            summary[capsule_key] = {**capsule_summary, "profile": stats["profile"]} if "profile" in stats else capsule_summary
+            if repaired_path and repaired_path not in repaired:
+                repaired.append(repaired_path)
+
+    def audit(paths):
+        for _, result in iter_capsule_audits(paths, dry_run=args.audit_only, jobs=args.jobs, cache=cache,
+                                             gpt_client=gpt_client, profile_dir=args.profile):
+            on_result(*result)
+
+    try:
+        audit(list_capsules(BASE_DIR))
+        if args.watch:
+            # Stay warm: cache, history, HTTP pool and YAML are already loaded,
+            # so each dropped capsule costs only its own audit.
+            from capsule_watch import CapsuleWatcher
+            watcher = CapsuleWatcher(BASE_DIR, settle=args.settle, file=console)
+            watcher.mark_current()
+
+            def on_ready(path):
+                try:
+                    audit([path])
+                except Exception as e:
+                    print(f"❌ {os.path.basename(path)}: audit failed: {e}", file=console, flush=True)
+
+            print(f"👀 Watching {BASE_DIR} for capsules (Ctrl+C to stop)...", file=console, flush=True)
+            try:
+                watcher.run(on_ready)
+            except KeyboardInterrupt:
+                print("\n🛑 Watch stopped.", file=console)
+        if history:
+            history.finish_run(run_id)
+    finally:
+        gpt_client.close()
+        if jsonl and jsonl is not sys.stdout:
+            jsonl.close()
+        if cache:
+            print(f"🗃 Audit cache: {cache.hits} hit(s), {cache.misses} miss(es)", file=console)
+            cache.close()
+        if history:
+            history.close()
+
+    if slowest:
+        table = slowest_table([entry for _, _, entry in slowest], args.top)
+        if table:
+            print(f"\n⏱ Slowest capsules:\n{table}", file=console)
+    if args.profile:
+        merged = merge_profiles(args.profile)
+        if merged:
+            print(f"📈 cProfile dump: {merged}", file=console)
 
-    if not args.audit_only:
-        import ace_tools as tools
-        tools.display_dataframe_to_user(name="Repaired Capsules", dataframe={"Repaired Capsules": repaired})
+    if not args.audit_only and not jsonl:
+        try:
+            import ace_tools as tools
+        except ImportError:
+            tools = None  # only present inside the notebook sandbox
+        if tools:
+            tools.display_dataframe_to_user(name="Repaired Capsules", dataframe={"Repaired Capsules": sorted(repaired)})
 
+        # audit_capsule only creates the directory when it repairs something.
+        os.makedirs(AUDITOR_OUTPUT_DIR, exist_ok=True)
         with open(os.path.join(AUDITOR_OUTPUT_DIR, "audit_summary_all.json"), "w") as f:
-            json.dump(summary, f, indent=2)
+            json.dump(dict(sorted(summary.items())), f, indent=2)
@@ -0,0 +1,250 @@
+"""Content-addressed store of compressed capsule entries.
+
+Every entry body is stored once, already compressed, under the SHA-256 of
+its uncompressed bytes (``/mnt/data/.capsule_blobs`` or
+``CAPSULE_BLOB_STORE``). A capsule is then just a recipe -- entry name ->
+blob reference, plus the file mode when the entry came from disk -- and
+exporting it to a standalone ``.camp`` copies the
+stored bytes into the archive without recompressing anything. Bodies
+shared between capsules (the same gpt_ui_sync.js, the same nested
+capsule inside the shrine bundle) are compressed and stored only once,
+across builds as well. The generator scripts that share snippets use the
+store when ``CAPSULE_USE_BLOBS=true`` (see store_from_env()).
+
+    python capsule_blobs.py export Light3_Reflex_Shrine_Healed.recipe.json OUT.camp
+    python capsule_blobs.py stats
+    python capsule_blobs.py gc [--recipes DIR ...] [--dry-run]
+
+Blobs no live ``.recipe.json`` refers to are only removed by ``gc``.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+import zipfile
+import zlib
+
+from capsule_seal import CHUNK_SIZE, SealedZip
+from capsule_zip import write_raw_entry
+
+RECIPE_FORMAT = "capsule-recipe/1"
+STORE_ENV = "CAPSULE_BLOB_STORE"
+USE_ENV = "CAPSULE_USE_BLOBS"
+DEFAULT_STORE_DIR = "/mnt/data/.capsule_blobs"
+GC_MIN_AGE = 3600.0  # seconds; younger blobs may belong to a build whose recipe isn't written yet
+
+
+def recipe_path_for(path):
+    return os.path.splitext(os.fspath(path))[0] + ".recipe.json"
+
+
+class BlobStore:
+    def __init__(self, root=None):
+        self.root = root or os.environ.get(STORE_ENV) or DEFAULT_STORE_DIR
+        self.stored = self.reused = 0
+        self.bytes_stored = self.bytes_reused = 0
+
+    def _path(self, digest, compress_type, compresslevel):
+        level = "d" if compresslevel is None else compresslevel
+        return os.path.join(self.root, digest[:2], f"{digest}.{compress_type}.{level}")
+
+    def path_for(self, ref):
+        return self._path(ref["sha256"], ref["stored_type"], ref["compresslevel"])
+
+    def put(self, data, compression=zipfile.ZIP_DEFLATED, compresslevel=None):
+        """Store ``data`` (bytes) and return its reference."""
+        return self._put(hashlib.sha256(data).hexdigest(), zlib.crc32(data), len(data),
+                         lambda: [data], compression, compresslevel)
+
+    def put_file(self, path, compression=zipfile.ZIP_DEFLATED, compresslevel=None):
+        """Store a file's contents, reading it in chunks; it is only compressed if new."""
+        sha, crc, size = hashlib.sha256(), 0, 0
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                sha.update(chunk)
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+
+        def chunks():
+            with open(path, "rb") as f:
+                yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+        return self._put(sha.hexdigest(), crc, size, chunks, compression, compresslevel)
+
+    def _put(self, digest, crc, size, chunks, compression, compresslevel):
+        if compression == zipfile.ZIP_STORED:
+            compresslevel = None
+        elif compression != zipfile.ZIP_DEFLATED:
+            raise ValueError(f"Unsupported compression for blobs: {compression}")
+        ref = {"sha256": digest, "crc": crc, "size": size}
+
+        # Bodies that don't shrink (nested capsules, images) are kept stored
+        # even when deflate was asked for, so look for either form.
+        candidates = [(compression, compresslevel)]
+        if compression != zipfile.ZIP_STORED:
+            candidates.append((zipfile.ZIP_STORED, None))
+        for stored_type, level in candidates:
+            path = self._path(digest, stored_type, level)
+            if os.path.exists(path):
+                os.utime(path)  # in use again: keep it out of gc's grace window
+                ref.update(stored_type=stored_type, compresslevel=level, compress_size=os.path.getsize(path))
+                self.reused += 1
+                self.bytes_reused += size
+                return ref
+
+        compressor = None
+        if compression == zipfile.ZIP_DEFLATED:
+            compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION if compresslevel is None else compresslevel,
+                                          zlib.DEFLATED, -15)
+        path = self._path(digest, compression, compresslevel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp, compress_size = self._write_tmp(path, chunks(), compressor)
+        if compressor is not None and compress_size >= size:
+            os.remove(tmp)
+            compression, compresslevel = zipfile.ZIP_STORED, None
+            path = self._path(digest, compression, compresslevel)
+            tmp, compress_size = self._write_tmp(path, chunks())
+        os.replace(tmp, path)
+        ref.update(stored_type=compression, compresslevel=compresslevel, compress_size=compress_size)
+        self.stored += 1
+        self.bytes_stored += compress_size
+        return ref
+
+    @staticmethod
+    def _write_tmp(path, chunks, compressor=None):
+        # Compressed output goes straight to disk, so a body is never held whole in memory.
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as out:
+            for chunk in chunks:
+                out.write(compressor.compress(chunk) if compressor else chunk)
+            if compressor:
+                out.write(compressor.flush())
+            return tmp, out.tell()
+
+    def iter_raw(self, ref, chunk_size=CHUNK_SIZE):
+        with open(self.path_for(ref), "rb") as f:
+            yield from iter(lambda: f.read(chunk_size), b"")
+
+    def write_entry(self, zipf, arcname, ref, date_time=(1980, 1, 1, 0, 0, 0), external_attr=0o644 << 16):
+        """Append a blob to an open ZipFile as ``arcname``; returns the stored-bytes digest."""
+        zinfo = zipfile.ZipInfo(arcname, date_time)
+        zinfo.create_system = 3
+        zinfo.external_attr = external_attr
+        zinfo.compress_type = ref["stored_type"]
+        zinfo.CRC = ref["crc"]
+        zinfo.file_size = ref["size"]
+        zinfo.compress_size = ref["compress_size"]
+        return write_raw_entry(zipf, zinfo, self.iter_raw(ref))
+
+    def export(self, recipe, dst_path):
+        """Write a standalone, sealed archive from a recipe; returns its SHA-256."""
+        date_time = tuple(recipe.get("date_time", (1980, 1, 1, 0, 0, 0)))
+        sealer = SealedZip(dst_path)
+        with sealer as zipf:
+            for arcname in sorted(recipe["entries"]):
+                ref = recipe["entries"][arcname]
+                # Entries staged from disk keep their mode (launch scripts stay executable).
+                self.write_entry(zipf, arcname, ref, date_time, (ref.get("mode", 0o644) & 0xFFFF) << 16)
+        return sealer.digest
+
+    def gc(self, recipes, min_age=GC_MIN_AGE, dry_run=False):
+        """Remove blobs none of ``recipes`` (loaded recipe dicts) refer to; returns (files, bytes).
+
+        Blobs touched within ``min_age`` seconds are kept, since a running
+        build may have stored them before writing its recipe.
+        """
+        live = {os.path.normpath(self.path_for(ref)) for recipe in recipes for ref in recipe["entries"].values()}
+        cutoff = time.time() - min_age
+        files = size = 0
+        for root, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.normpath(os.path.join(root, name))
+                if path in live or name.endswith(".tmp"):
+                    continue
+                st = os.stat(path)
+                if st.st_mtime > cutoff:
+                    continue
+                if not dry_run:
+                    os.remove(path)
+                files += 1
+                size += st.st_size
+        return files, size
+
+    def usage(self):
+        files = size = 0
+        for root, _, names in os.walk(self.root):
+            for name in names:
+                files += 1
+                size += os.path.getsize(os.path.join(root, name))
+        return files, size
+
+
+def store_from_env():
+    """The shared BlobStore when ``CAPSULE_USE_BLOBS=true``, else None (archives are written directly)."""
+    if os.getenv(USE_ENV, "false").lower() != "true":
+        return None
+    return BlobStore()
+
+
+def make_recipe(entries, date_time=(1980, 1, 1, 0, 0, 0)):
+    return {"format": RECIPE_FORMAT, "date_time": list(date_time), "entries": dict(sorted(entries.items()))}
+
+
+def write_recipe(path, recipe):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(recipe, f, indent=2)
+    return path
+
+
+def load_recipe(path):
+    with open(path, "r", encoding="utf-8") as f:
+        recipe = json.load(f)
+    if recipe.get("format") != RECIPE_FORMAT:
+        raise ValueError(f"Unsupported recipe format in {path}: {recipe.get('format')!r}")
+    return recipe
+
+
+def find_recipes(dirs, skip=None):
+    """Every ``.recipe.json`` under ``dirs``, not descending into ``skip`` (the store)."""
+    skip = os.path.abspath(skip) if skip else None
+    paths = []
+    for top in dirs:
+        for root, subdirs, names in os.walk(os.path.abspath(top)):
+            subdirs[:] = [d for d in subdirs if os.path.join(root, d) != skip]
+            paths.extend(os.path.join(root, n) for n in names if n.endswith(".recipe.json"))
+    return sorted(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the capsule blob store and export recipes to .camp files.")
+    parser.add_argument("--store", default=None, help="Blob store directory.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export", help="Write a standalone capsule from a recipe.")
+    p_export.add_argument("recipe")
+    p_export.add_argument("output")
+    sub.add_parser("stats", help="Show how much the store holds.")
+    p_gc = sub.add_parser("gc", help="Remove blobs that no recipe refers to.")
+    p_gc.add_argument("--recipes", nargs="+", default=None,
+                      help="Directories searched for .recipe.json files (default: the store's parent).")
+    p_gc.add_argument("--min-age", type=float, default=GC_MIN_AGE,
+                      help="Keep blobs touched within this many seconds.")
+    p_gc.add_argument("--dry-run", action="store_true", help="Only report what would be removed.")
+    args = parser.parse_args()
+
+    store = BlobStore(args.store)
+    if args.command == "export":
+        recipe = load_recipe(args.recipe)
+        digest = store.export(recipe, args.output)
+        print(f"📦 {args.output}: {len(recipe['entries'])} entries, sha256 {digest}")
+    elif args.command == "gc":
+        recipe_paths = find_recipes(args.recipes or [os.path.dirname(os.path.abspath(store.root))], store.root)
+        files, size = store.gc([load_recipe(p) for p in recipe_paths], args.min_age, args.dry_run)
+        verb = "Would remove" if args.dry_run else "Removed"
+        print(f"🧹 {verb} {files} unreferenced blob(s), {size / 1e6:.1f} MB ({len(recipe_paths)} recipe(s) live)")
+    else:
+        files, size = store.usage()
+        print(f"🗄 {store.root}: {files} blob(s), {size / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Build capsules straight from memory.
+
+Generator scripts used to write every file into a staging directory under
+``/mnt/data``, walk it and zip it back up. CapsuleBuilder takes the
+entries as bytes, text, JSON, YAML or a QR payload and writes them
+directly into the archive, so a build touches the disk exactly once.
+
+    builder = CapsuleBuilder()
+    builder.add_text("overlay/gpt_ui_sync.js", js)
+    builder.add_json("manifest.json", manifest)
+    builder.add_yaml("reflect.yaml", reflect)
+    builder.add_qr("operator_mesh_qr.png", "camp://Operator_Browser_Cortex_v3")
+    builder.build("/mnt/data/Operator_Browser_Cortex_v3.camp")
+
+Builds are reproducible: entries are sorted, timestamps are fixed
+(``SOURCE_DATE_EPOCH`` if set, else 1980-01-01), file attributes and
+compression settings are pinned. The same inputs therefore always give
+byte-identical archives, and build() keys a small build cache on the
+hash of those inputs. When the recorded artifact is still in place with
+a matching ``.sig``, a rebuild returns it without writing anything.
+
+With ``blob_store=BlobStore()`` every entry goes through the shared
+content-addressed store (see capsule_blobs.py): bodies already compressed
+by any earlier build are copied in as-is, and a ``.recipe.json`` listing
+the blobs is written next to the archive.
+"""
+import hashlib
+import json
+import os
+import time
+import zipfile
+
+from capsule_seal import SealedZip, copy_sealed, read_sig, sig_path_for
+
+BUILD_FORMAT = "capsule-build/1"
+CACHE_ENV = "CAPSULE_BUILD_CACHE"
+CACHE_DIR_NAME = ".capsule_build_cache"
+DEFAULT_COMPRESSLEVEL = {zipfile.ZIP_DEFLATED: 6, zipfile.ZIP_BZIP2: 9, zipfile.ZIP_LZMA: None, zipfile.ZIP_STORED: None}
+
+
+def build_date_time():
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if epoch:
+        return max(time.gmtime(int(epoch))[:6], (1980, 1, 1, 0, 0, 0))
+    return (1980, 1, 1, 0, 0, 0)
+
+
+def default_cache_dir(path):
+    return os.environ.get(CACHE_ENV) or os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+
+
+class CapsuleBuilder:
+    def __init__(self, compression=zipfile.ZIP_STORED, compresslevel=None, cache=True, blob_store=None):
+        # ZIP_STORED matches ZipFile's default, which most generator scripts relied on.
+        self.compression = compression
+        self.compresslevel = compresslevel if compresslevel is not None else DEFAULT_COMPRESSLEVEL.get(compression)
+        self.cache = cache
+        self.blob_store = blob_store
+        self.entries = {}
+        self.cache_hit = False
+        self.sha256 = None
+
+    def __contains__(self, arcname):
+        return arcname in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add_bytes(self, arcname, data):
+        self.entries[arcname.replace(os.sep, "/")] = bytes(data)
+        return self
+
+    def add_text(self, arcname, text, encoding="utf-8"):
+        return self.add_bytes(arcname, text.encode(encoding))
+
+    def add_json(self, arcname, data, indent=2):
+        return self.add_text(arcname, json.dumps(data, indent=indent))
+
+    def add_yaml(self, arcname, data):
+        import yaml
+        return self.add_text(arcname, yaml.dump(data, Dumper=getattr(yaml, "CDumper", yaml.Dumper)))
+
+    def add_qr(self, arcname, data, **options):
+        """Add ``data`` as a QR code PNG, rendered through the shared glyph cache."""
+        from capsule_glyphs import render_png
+        return self.add_bytes(arcname, render_png(data, **options))
+
+    def input_digest(self):
+        """Hash of everything that determines the archive bytes."""
+        h = hashlib.sha256(json.dumps([BUILD_FORMAT, self.compression, self.compresslevel, build_date_time(),
+                                       self.blob_store is not None]).encode())
+        for arcname in sorted(self.entries):
+            data = self.entries[arcname]
+            h.update(f"{arcname}\0{len(data)}\0".encode("utf-8"))
+            h.update(data)
+        return h.hexdigest()
+
+    def write(self, path):
+        """Write the archive deterministically and seal it; returns its SHA-256."""
+        date_time = build_date_time()
+        if self.blob_store is not None:
+            return self._write_blobs(path, date_time)
+        sealer = SealedZip(path, self.compression)
+        with sealer as zipf:
+            for arcname in sorted(self.entries):
+                zinfo = zipfile.ZipInfo(arcname, date_time)
+                zinfo.create_system = 3
+                zinfo.compress_type = self.compression
+                zinfo.external_attr = 0o644 << 16
+                zipf.writestr(zinfo, self.entries[arcname], compresslevel=self.compresslevel)
+        from capsule_blobs import recipe_path_for
+        if os.path.exists(recipe_path_for(path)):
+            os.remove(recipe_path_for(path))  # left by an earlier blob-store build
+        return sealer.digest
+
+    def _write_blobs(self, path, date_time):
+        from capsule_blobs import make_recipe, recipe_path_for, write_recipe
+        refs = {arcname: self.blob_store.put(data, self.compression, self.compresslevel)
+                for arcname, data in self.entries.items()}
+        recipe = make_recipe(refs, date_time)
+        digest = self.blob_store.export(recipe, path)
+        write_recipe(recipe_path_for(path), recipe)
+        return digest
+
+    def build(self, path, cache_dir=None):
+        """Build ``path`` (sealed with a ``.sig``), reusing a cached artifact when the inputs are unchanged."""
+        self.cache_hit = False
+        if not self.cache:
+            self.sha256 = self.write(path)
+            return path
+
+        cache_dir = cache_dir or default_cache_dir(path)
+        record_path = os.path.join(cache_dir, f"{self.input_digest()}.json")
+        record = _load_record(record_path)
+        if record and _artifact_ok(record["artifact"], record):
+            self.cache_hit, self.sha256 = True, record["sha256"]
+            if os.path.abspath(path) != record["artifact"] and not _artifact_ok(path, record):
+                copy_sealed(record["artifact"], path)
+            return path
+
+        self.sha256 = self.write(path)
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(record_path, "w", encoding="utf-8") as f:
+            json.dump({"artifact": os.path.abspath(path), "sha256": self.sha256, "size": os.path.getsize(path)}, f)
+        return path
+
+
+def _load_record(record_path):
+    try:
+        with open(record_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _artifact_ok(path, record):
+    # A stat and a 100-byte .sig read: cheap enough to run on every build.
+    try:
+        return os.path.getsize(path) == record["size"] and read_sig(sig_path_for(path)) == record["sha256"]
+    except OSError:
+        return False
@@ -0,0 +1,195 @@
+"""Shared QR glyph service for capsule builds.
+
+Glyphs are cached by payload and render options: in memory for the life
+of the process, and on disk (``/mnt/data/.capsule_glyph_cache`` or
+``CAPSULE_GLYPH_CACHE``) across builds. A cache hit doesn't import qrcode
+or PIL at all. On a miss, only qrcode's module matrix is computed; PNGs
+are encoded straight from the matrix as 1-bit images with zlib (no PIL),
+and SVG or the raw matrix can be requested instead.
+
+    render_png("camp://Operator_Browser_Cortex_v3")
+    render_many(["camp://a", "camp://b"], fmt="svg")
+    python capsule_glyphs.py PAYLOAD [PAYLOAD ...] --out DIR [--svg]
+"""
+import argparse
+import hashlib
+import json
+import os
+import struct
+import zlib
+
+GLYPH_FORMAT = "capsule-glyph/1"
+CACHE_ENV = "CAPSULE_GLYPH_CACHE"
+DEFAULT_CACHE_DIR = "/mnt/data/.capsule_glyph_cache"
+
+# qrcode.make() defaults, so cached glyphs look exactly like the old ones.
+DEFAULT_OPTIONS = {"version": None, "error_correction": "M", "box_size": 10, "border": 4}
+FORMATS = {"png": ".png", "svg": ".svg", "matrix": ".json"}
+
+_memo = {}
+
+
+def cache_dir():
+    return os.environ.get(CACHE_ENV) or DEFAULT_CACHE_DIR
+
+
+def _options(options):
+    unknown = set(options) - set(DEFAULT_OPTIONS)
+    if unknown:
+        raise TypeError(f"Unknown glyph option(s): {', '.join(sorted(unknown))}")
+    return {**DEFAULT_OPTIONS, **options}
+
+
+def glyph_key(payload, fmt, options):
+    return hashlib.sha256(json.dumps([GLYPH_FORMAT, fmt, payload, options], sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def qr_matrix(payload, **options):
+    """Module matrix (border included) as a list of rows of booleans, True = dark."""
+    return json.loads(_render(payload, "matrix", _options(options)))
+
+
+def _matrix(payload, options):
+    import qrcode
+    qr = qrcode.QRCode(version=options["version"], border=options["border"],
+                       error_correction=getattr(qrcode.constants, f"ERROR_CORRECT_{options['error_correction']}"))
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def _png_chunk(tag, data):
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+
+def matrix_to_png(matrix, box_size=10):
+    """Encode a module matrix as a 1-bit grayscale PNG."""
+    size = len(matrix) * box_size
+    row_bytes = (size + 7) // 8
+    lines = []
+    for row in matrix:
+        bits = "".join(("0" if dark else "1") * box_size for dark in row).ljust(row_bytes * 8, "1")
+        lines.append((b"\x00" + int(bits, 2).to_bytes(row_bytes, "big")) * box_size)
+    return (b"\x89PNG\r\n\x1a\n"
+            + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 1, 0, 0, 0, 0))
+            + _png_chunk(b"IDAT", zlib.compress(b"".join(lines), 9))
+            + _png_chunk(b"IEND", b""))
+
+
+def matrix_to_svg(matrix, box_size=10):
+    size = len(matrix) * box_size
+    runs = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < len(row):
+            if row[x]:
+                start = x
+                while x < len(row) and row[x]:
+                    x += 1
+                runs.append(f"M{start * box_size} {y * box_size}h{(x - start) * box_size}v{box_size}h-{(x - start) * box_size}z")
+            else:
+                x += 1
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 {size} {size}">'
+            f'<rect width="100%" height="100%" fill="#fff"/><path fill="#000" d="{"".join(runs)}"/></svg>\n').encode("utf-8")
+
+
+def _encode(payload, fmt, options):
+    matrix = _matrix(payload, options)
+    if fmt == "png":
+        return matrix_to_png(matrix, options["box_size"])
+    if fmt == "svg":
+        return matrix_to_svg(matrix, options["box_size"])
+    return json.dumps(matrix, separators=(",", ":")).encode("utf-8")
+
+
+def _render(payload, fmt, options):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown glyph format: {fmt!r}")
+    key = glyph_key(payload, fmt, options)
+    data = _memo.get(key)
+    if data is not None:
+        return data
+    try:
+        with open(os.path.join(cache_dir(), key + FORMATS[fmt]), "rb") as f:
+            data = _memo[key] = f.read()
+    except OSError:
+        data = _store(key, fmt, _encode(payload, fmt, options))
+    return data
+
+
+def _store(key, fmt, data):
+    _memo[key] = data
+    path = os.path.join(cache_dir(), key + FORMATS[fmt])
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # a read-only cache only costs us the re-render
+    return data
+
+
+def render_png(payload, **options):
+    return _render(payload, "png", _options(options))
+
+
+def render_svg(payload, **options):
+    return _render(payload, "svg", _options(options))
+
+
+def write_png(path, payload, **options):
+    """Drop-in for ``qrcode.make(payload).save(path)``."""
+    with open(path, "wb") as f:
+        f.write(render_png(payload, **options))
+    return path
+
+
+def render_many(payloads, fmt="png", workers=None, **options):
+    """Render {payload: bytes} for many payloads, sharing the cache.
+
+    Misses are rendered across ``workers`` processes when there are enough
+    of them to pay for the pool.
+    """
+    options = _options(options)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown glyph format: {fmt!r}")
+    results, misses = {}, []
+    for payload in dict.fromkeys(payloads):
+        key = glyph_key(payload, fmt, options)
+        if key in _memo or os.path.exists(os.path.join(cache_dir(), key + FORMATS[fmt])):
+            results[payload] = _render(payload, fmt, options)
+        else:
+            misses.append(payload)
+    if workers != 1 and len(misses) > 8:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            encoded = pool.map(_encode, misses, [fmt] * len(misses), [options] * len(misses), chunksize=4)
+            for payload, data in zip(misses, encoded):
+                results[payload] = _store(glyph_key(payload, fmt, options), fmt, data)
+    for payload in misses:
+        if payload not in results:
+            results[payload] = _render(payload, fmt, options)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render QR glyphs through the shared glyph cache.")
+    parser.add_argument("payloads", nargs="+")
+    parser.add_argument("--out", default=".", help="Output directory.")
+    parser.add_argument("--svg", action="store_true", help="Write SVG instead of PNG.")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    fmt = "svg" if args.svg else "png"
+    os.makedirs(args.out, exist_ok=True)
+    for payload, data in render_many(args.payloads, fmt, args.workers).items():
+        path = os.path.join(args.out, f"{glyph_key(payload, fmt, DEFAULT_OPTIONS)[:16]}{FORMATS[fmt]}")
+        with open(path, "wb") as f:
+            f.write(data)
+        print(f"🔳 {payload} -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Pooled, bounded-concurrency client for the local GPT assist endpoint.
+
+All requests share one ``requests.Session`` (keep-alive connection pool)
+and carry a timeout. ``ask_many`` fans a batch of prompts out over a
+thread pool of ``max_concurrency`` workers (which is the bound), so an
+audit of many capsules costs roughly
+``ceil(n / max_concurrency)`` round-trips instead of ``n``. Replies are
+cached by (endpoint, prompt, capsule hash) in memory and, when an
+AuditCache is supplied, on disk across runs.
+"""
+import hashlib
+import json
+import threading
+
+DEFAULT_ENDPOINT = "http://localhost:11434/gpt"
+DEFAULT_TIMEOUT = (3.05, 30)
+DEFAULT_CONCURRENCY = 8
+
+
+class GPTAssistClient:
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_concurrency=DEFAULT_CONCURRENCY, cache=None):
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self._memo = {}
+        self._session = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_concurrency)
+                self._session.mount("http://", adapter)
+                self._session.mount("https://", adapter)
+            return self._session
+
+    def close(self):
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._session:
+            self._session.close()
+            self._session = None
+
+    @staticmethod
+    def cache_key(url, prompt, capsule_sha=None):
+        return hashlib.sha256(json.dumps([url, prompt, capsule_sha]).encode("utf-8")).hexdigest()
+
+    # Cache access stays on the calling thread (sqlite connections are not shared).
+    def _lookup(self, key):
+        if key in self._memo:
+            return self._memo[key]
+        reply = self.cache.get_gpt_response(key) if self.cache else None
+        if reply is not None:
+            self._memo[key] = reply
+        return reply
+
+    def _store(self, key, reply):
+        self._memo[key] = reply
+        if self.cache:
+            self.cache.put_gpt_response(key, reply)
+
+    def _post(self, prompt, url):
+        try:
+            res = self.session.post(url, json={"prompt": prompt}, timeout=self.timeout)
+            return True, res.json().get("response", "No reply.")
+        except Exception as e:
+            return False, f"[GPT Error] {e}"
+
+    def ask(self, prompt, url=DEFAULT_ENDPOINT, capsule_sha=None):
+        key = self.cache_key(url, prompt, capsule_sha)
+        reply = self._lookup(key)
+        if reply is None:
+            ok, reply = self._post(prompt, url)
+            if ok:
+                self._store(key, reply)
+        return reply
+
+    def ask_many(self, requests_by_key):
+        """Resolve {key: (prompt, url, capsule_sha)} to {key: reply} concurrently."""
+        replies, misses = {}, {}
+        for key, (prompt, url, capsule_sha) in requests_by_key.items():
+            cache_key = self.cache_key(url, prompt, capsule_sha)
+            reply = self._lookup(cache_key)
+            if reply is None:
+                misses[key] = (prompt, url, cache_key)
+            else:
+                replies[key] = reply
+        if not misses:
+            return replies
+
+        # The thread pool is only imported once a batch actually needs the
+        # network; cached and audit-only runs never load it. Plain futures also
+        # work when the caller already runs an event loop.
+        from concurrent.futures import ThreadPoolExecutor
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+
+        futures = {key: self._executor.submit(self._post, prompt, url) for key, (prompt, url, _) in misses.items()}
+        for key, future in futures.items():
+            ok, reply = future.result()
+            if ok:
+                self._store(misses[key][2], reply)
+            replies[key] = reply
+        return replies
+
+
+_default_client = None
+
+
+def default_client():
+    global _default_client
+    if _default_client is None:
+        _default_client = GPTAssistClient()
+    return _default_client
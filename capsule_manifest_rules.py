@@ -0,0 +1,158 @@
+"""Declarative manifest rules, compiled once and checked against a CapsuleIndex.
+
+The rule set lives in ``manifest_rules.yaml`` (or the file named by
+``CAPSULE_MANIFEST_RULES``). Selectors are compiled to small extractor
+chains when the file is loaded, and every file reference a manifest makes
+is resolved in one pass of set lookups against the capsule's entry index,
+so adding rules does not add archive scans.
+"""
+import fnmatch
+import os
+import posixpath
+import re
+from functools import lru_cache
+
+RULES_ENV = "CAPSULE_MANIFEST_RULES"
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "manifest_rules.yaml")
+
+GLOB_CHARS = ("*", "?", "[")
+
+# Chrome match patterns: <all_urls> or scheme://host/path.
+HOST_PATTERN = re.compile(r"^(<all_urls>|(\*|https?|wss?|ftp|urn)://(\*|(\*\.)?[^/*:]+)(:\d+|:\*)?/.*|file:///.*)$")
+
+
+def rules_path():
+    return os.environ.get(RULES_ENV) or DEFAULT_RULES_PATH
+
+
+# --- selectors -------------------------------------------------------------
+
+def _key(name):
+    def step(loc, value):
+        if isinstance(value, dict) and name in value:
+            yield f"{loc}.{name}" if loc else name, value[name]
+    return step
+
+
+def _items(loc, value):
+    if isinstance(value, list):
+        for i, item in enumerate(value):
+            yield f"{loc}[{i}]", item
+    elif value is not None:
+        yield loc, value
+
+
+def _values(loc, value):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield f"{loc}.{key}", item
+    elif value is not None:
+        yield loc, value
+
+
+def compile_selector(selector):
+    """Compile "a.b[].c.*" into a function returning [(location, value), ...]."""
+    steps = []
+    for part in selector.split("."):
+        if part == "*":
+            steps.append(_values)
+            continue
+        iterate = part.endswith("[]")
+        steps.append(_key(part[:-2] if iterate else part))
+        if iterate:
+            steps.append(_items)
+
+    def select(manifest):
+        found = [("", manifest)]
+        for step in steps:
+            found = [hit for loc, value in found for hit in step(loc, value)]
+        return found
+    return select
+
+
+@lru_cache(maxsize=None)
+def _glob(pattern):
+    return re.compile(fnmatch.translate(pattern)).match
+
+
+# --- rule set --------------------------------------------------------------
+
+class FileRule:
+    def __init__(self, spec):
+        self.id = spec["id"]
+        self.label = spec.get("label", self.id)
+        self.severity = spec.get("severity", "error")
+        self.penalty = spec.get("penalty", 0)
+        self.select = compile_selector(spec["select"])
+
+
+class ManifestRules:
+    def __init__(self, spec, source=None):
+        self.source = source
+        required = spec.get("required", {})
+        self.required_defaults = dict(required.get("defaults", {}))
+        self.required_penalty = required.get("penalty", 10)
+
+        permissions = spec.get("permissions", {})
+        self.permission_fields = [compile_selector(f"{field}[]") for field in permissions.get("fields", ["permissions"])]
+        self.permission_penalty = permissions.get("penalty", 5)
+        self.permission_risk = permissions.get("risk", "medium")
+        self.known_permissions = set(permissions["known"]) if "known" in permissions else None
+
+        hosts = spec.get("host_permissions", {})
+        self.host_fields = [compile_selector(field if field.endswith("[]") else f"{field}[]")
+                            for field in hosts.get("fields", [])]
+        self.host_severity = hosts.get("severity", "warning")
+        self.host_penalty = hosts.get("penalty", 0)
+
+        self.files = [FileRule(rule) for rule in spec.get("files", [])]
+
+    def missing_fields(self, manifest):
+        return [key for key in self.required_defaults if key not in manifest]
+
+    def unknown_permissions(self, manifest, known):
+        known = self.known_permissions if self.known_permissions is not None else known
+        return [perm for select in self.permission_fields for _, perm in select(manifest)
+                if isinstance(perm, str) and perm not in known]
+
+    def invalid_host_patterns(self, manifest):
+        return [(loc, pattern) for select in self.host_fields for loc, pattern in select(manifest)
+                if not isinstance(pattern, str) or not HOST_PATTERN.match(pattern)]
+
+    def check_files(self, manifest, index, base_dir=""):
+        """Return [(rule, location, path, found)] for every file the manifest references.
+
+        Paths are looked up relative to ``base_dir`` (the manifest's folder)
+        and the capsule root; globs must match at least one entry.
+        """
+        refs = [(rule, loc, path) for rule in self.files for loc, path in rule.select(manifest)
+                if isinstance(path, str) and path]
+        results = []
+        for rule, loc, path in refs:
+            key = posixpath.normpath(path.replace("\\", "/")).lstrip("/")
+            candidates = {key, posixpath.normpath(posixpath.join(base_dir, key))} if base_dir else {key}
+            if any(c in path for c in GLOB_CHARS):
+                match = [_glob(c) for c in candidates]
+                found = any(m(entry) for entry in index.paths for m in match)
+            else:
+                found = any(c in index.paths or c in index.dirs for c in candidates)
+            results.append((rule, loc, path, found))
+        return results
+
+
+_loaded = {}
+
+
+def load_rules(path=None):
+    """Load and compile a rule file, recompiling only when it changes on disk."""
+    path = os.path.abspath(path or rules_path())
+    mtime = os.stat(path).st_mtime_ns
+    cached = _loaded.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    import yaml
+    with open(path, "r", encoding="utf-8") as f:
+        spec = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)) or {}
+    rules = ManifestRules(spec, source=path)
+    _loaded[path] = (mtime, rules)
+    return rules
@@ -0,0 +1,87 @@
+"""Cheap per-stage instrumentation for capsule audits.
+
+StageTimer accumulates wall time per named stage plus free-form counters
+(bytes read/written, entry counts); CountingReader counts the bytes a
+ZipFile actually pulls from disk. Both cost a couple of perf_counter()
+calls per stage, so they stay on in production.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def elapsed_ms(self):
+        return round((time.perf_counter() - self._started) * 1000, 3)
+
+    def as_dict(self):
+        return {
+            "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            **self.counters,
+        }
+
+
+class CountingReader:
+    """Read-only file wrapper that counts bytes read (pass it to ZipFile)."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.bytes_read = 0
+
+    def read(self, n=-1):
+        data = self.fileobj.read(n)
+        self.bytes_read += len(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.fileobj, name)
+
+
+def slowest_table(results, top=5):
+    """Format the ``top`` slowest audited capsules with their stage breakdown."""
+    rows = sorted((r for r in results if not r[3].get("cached")), key=lambda r: r[3]["elapsed_ms"], reverse=True)[:top]
+    if not rows:
+        return ""
+    stages = []
+    for row in rows:
+        for name in row[3].get("profile", {}).get("stages_ms", {}):
+            if name not in stages:
+                stages.append(name)
+    width = max(len("capsule"), *(len(row[0]) for row in rows))
+    lines = [f"{'capsule':<{width}}  {'total ms':>9}" + "".join(f"  {name:>9}" for name in stages)]
+    for capsule_key, _, _, stats in rows:
+        stage_ms = stats.get("profile", {}).get("stages_ms", {})
+        lines.append(f"{capsule_key:<{width}}  {stats['elapsed_ms']:>9.1f}"
+                     + "".join(f"  {stage_ms.get(name, 0.0):>9.1f}" for name in stages))
+    return "\n".join(lines)
+
+
+def merge_profiles(profile_dir, output_name="audit.prof"):
+    """Merge the per-capsule cProfile dumps in ``profile_dir`` into one file."""
+    import pstats
+    dumps = sorted(os.path.join(profile_dir, f) for f in os.listdir(profile_dir)
+                   if f.endswith(".prof") and f != output_name)
+    if not dumps:
+        return None
+    stats = pstats.Stats(dumps[0])
+    for dump in dumps[1:]:
+        stats.add(dump)
+    merged = os.path.join(profile_dir, output_name)
+    stats.dump_stats(merged)
+    return merged
@@ -0,0 +1,329 @@
+"""Streaming SHA-256 sealing shared by every ``.sig`` writer.
+
+Files are hashed through a fixed, reused buffer so memory stays flat no
+matter how large the capsule is, and archives being written can be hashed
+on the fly (SealedZip) so they never have to be read back.
+
+``.sig`` files use the ``sha256sum`` layout -- ``<hex digest>  <file name>``
+-- so they can also be checked with ``sha256sum -c``.
+
+Alongside the whole-archive ``.sig``, capsules can carry a Merkle seal
+(``<capsule>.seal.json``): one digest per entry plus a root hash. Entries
+can then be verified individually and across threads, and two seals can
+be diffed to see exactly which entries changed.
+
+    python capsule_seal.py seal CAPSULE
+    python capsule_seal.py verify CAPSULE [ENTRY ...] [--workers N]
+    python capsule_seal.py diff OLD.seal.json NEW.seal.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import zipfile
+
+from capsule_zip import iter_raw_entry
+
+SEAL_FORMAT = "capsule-merkle-seal/1"
+
+CHUNK_SIZE = 1 << 20
+
+
+def hash_file(path, chunk_size=CHUNK_SIZE):
+    h = hashlib.sha256()
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.hexdigest()
+
+
+def sig_path_for(path):
+    return os.fspath(path) + ".sig"
+
+
+def write_sig(path, digest, sig_path=None):
+    sig_path = sig_path or sig_path_for(path)
+    with open(sig_path, "w", encoding="utf-8") as sig:
+        sig.write(f"{digest}  {os.path.basename(os.fspath(path))}\n")
+    return sig_path
+
+
+def read_sig(sig_path):
+    with open(sig_path, "r", encoding="utf-8") as sig:
+        fields = sig.read().split()
+    return fields[0].lower() if fields else None
+
+
+def seal_file(path, sig_path=None):
+    digest = hash_file(path)
+    write_sig(path, digest, sig_path)
+    return digest
+
+
+def verify_file(path, sig_path=None):
+    return read_sig(sig_path or sig_path_for(path)) == hash_file(path)
+
+
+class HashingWriter:
+    """Write-only file wrapper that hashes everything passing through it.
+
+    It deliberately has no ``seek`` so ZipFile writes strictly forward
+    (using data descriptors) and the digest matches the bytes on disk.
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.fileobj.write(data)
+        self.sha.update(data)
+        self.size += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.size
+
+    def flush(self):
+        self.fileobj.flush()
+
+    def hexdigest(self):
+        return self.sha.hexdigest()
+
+
+class SealedZip:
+    """Context manager yielding a ZipFile whose ``.sig`` is written on close.
+
+        sealer = SealedZip(path)
+        with sealer as zipf:
+            zipf.writestr("manifest.json", data)
+        sealer.digest
+    """
+
+    def __init__(self, path, compression=zipfile.ZIP_DEFLATED, sig_path=None):
+        self.path = path
+        self.compression = compression
+        self.sig_path = sig_path
+        self.digest = None
+        self.size = 0
+
+    def __enter__(self):
+        self._file = open(self.path, "wb")
+        self._writer = HashingWriter(self._file)
+        self._zipf = zipfile.ZipFile(self._writer, "w", self.compression)
+        return self._zipf
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._zipf.close()
+        finally:
+            self._file.close()
+        if exc_type is None:
+            self.digest = self._writer.hexdigest()
+            self.size = self._writer.size
+            self.sig_path = write_sig(self.path, self.digest, self.sig_path)
+        return False
+
+
+def copy_sealed(src, dst, sig_path=None, chunk_size=CHUNK_SIZE):
+    """Copy ``src`` to ``dst`` and seal it, hashing during the copy."""
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        writer = HashingWriter(fdst)
+        for chunk in iter(lambda: fsrc.read(chunk_size), b""):
+            writer.write(chunk)
+    digest = writer.hexdigest()
+    write_sig(dst, digest, sig_path)
+    return digest
+
+
+# --- Merkle seal -----------------------------------------------------------
+#
+# Entry digests cover the bytes as stored in the archive, so sealing and
+# verifying never decompress anything. Each leaf also binds the entry name,
+# compression method and uncompressed size; leaves are ordered by name.
+
+def seal_path_for(path):
+    return os.fspath(path) + ".seal.json"
+
+
+def _leaf(name, meta):
+    return hashlib.sha256(b"\x00" + json.dumps(
+        [name, meta["compress_type"], meta["size"], meta["digest"]]).encode("utf-8")).digest()
+
+
+def merkle_root(entries):
+    level = [_leaf(name, entries[name]) for name in sorted(entries)]
+    if not level:
+        return hashlib.sha256(b"").hexdigest()
+    while len(level) > 1:
+        paired = [hashlib.sha256(b"\x01" + level[i] + level[i + 1]).digest() for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            paired.append(level[-1])
+        level = paired
+    return level[0].hex()
+
+
+def _seal(archive_name, entries):
+    return {
+        "format": SEAL_FORMAT,
+        "algorithm": "sha256",
+        "archive": os.path.basename(os.fspath(archive_name)),
+        "root": merkle_root(entries),
+        "entries": dict(sorted(entries.items())),
+    }
+
+
+def make_seal(archive_name, written):
+    """Build a seal from {arcname: (ZipInfo, stored-bytes digest)} as returned by capsule_zip.repack_into."""
+    return _seal(archive_name, {
+        name: {"digest": digest, "size": zinfo.file_size, "compress_type": zinfo.compress_type}
+        for name, (zinfo, digest) in written.items()
+    })
+
+
+class _ArchiveReaders:
+    """Per-thread ZipFile handles, since raw reads move the file position."""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.handles = []
+        self.lock = threading.Lock()
+
+    def get(self):
+        zip_ref = getattr(self.local, "zip_ref", None)
+        if zip_ref is None:
+            zip_ref = self.local.zip_ref = zipfile.ZipFile(self.path)
+            with self.lock:
+                self.handles.append(zip_ref)
+        return zip_ref
+
+    def close(self):
+        for zip_ref in self.handles:
+            zip_ref.close()
+
+
+def _entry_digests(path, names, workers):
+    from concurrent.futures import ThreadPoolExecutor
+    readers = _ArchiveReaders(path)
+
+    def digest(name):
+        zip_ref = readers.get()
+        try:
+            info = zip_ref.getinfo(name)
+        except KeyError:
+            return name, None
+        sha = hashlib.sha256()
+        for chunk in iter_raw_entry(zip_ref, info):
+            sha.update(chunk)
+        return name, {"digest": sha.hexdigest(), "size": info.file_size, "compress_type": info.compress_type}
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(pool.map(digest, names))
+    finally:
+        readers.close()
+
+
+def seal_archive(path, workers=None):
+    with zipfile.ZipFile(path) as zip_ref:
+        names = [info.filename for info in zip_ref.infolist() if not info.is_dir()]
+    return _seal(path, _entry_digests(path, names, workers))
+
+
+def write_seal(path, seal, seal_path=None):
+    seal_path = seal_path or seal_path_for(path)
+    with open(seal_path, "w", encoding="utf-8") as f:
+        json.dump(seal, f, indent=2)
+    return seal_path
+
+
+def load_seal(seal_path):
+    with open(seal_path, "r", encoding="utf-8") as f:
+        seal = json.load(f)
+    if seal.get("format") != SEAL_FORMAT:
+        raise ValueError(f"Unsupported seal format in {seal_path}: {seal.get('format')!r}")
+    return seal
+
+
+def verify_seal(path, seal=None, names=None, workers=None, expected_root=None):
+    """Check archive entries against a Merkle seal.
+
+    With ``names`` only those entries are read, e.g. the files a launcher is
+    about to use. The seal's own root is always recomputed from its entry
+    list, and compared with ``expected_root`` when one is given.
+    """
+    seal = seal or load_seal(seal_path_for(path))
+    sealed = seal["entries"]
+    root_ok = merkle_root(sealed) == seal["root"] and expected_root in (None, seal["root"])
+
+    if names is None:
+        with zipfile.ZipFile(path) as zip_ref:
+            present = [info.filename for info in zip_ref.infolist() if not info.is_dir()]
+        unexpected = sorted(set(present) - set(sealed))
+        names = sorted(sealed)
+    else:
+        unexpected = sorted(name for name in names if name not in sealed)
+        names = [name for name in names if name in sealed]
+
+    actual = _entry_digests(path, names, workers)
+    missing = sorted(name for name, meta in actual.items() if meta is None)
+    mismatched = sorted(name for name, meta in actual.items() if meta is not None and meta != sealed[name])
+    return {
+        "ok": root_ok and not (missing or mismatched or unexpected),
+        "root_ok": root_ok,
+        "checked": len(names),
+        "missing": missing,
+        "mismatched": mismatched,
+        "unexpected": unexpected,
+    }
+
+
+def diff_seals(old, new):
+    old_entries, new_entries = old["entries"], new["entries"]
+    return {
+        "added": sorted(set(new_entries) - set(old_entries)),
+        "removed": sorted(set(old_entries) - set(new_entries)),
+        "changed": sorted(name for name in set(old_entries) & set(new_entries)
+                          if old_entries[name] != new_entries[name]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seal and verify capsules with per-entry Merkle seals.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_seal = sub.add_parser("seal", help="Write CAPSULE.sig and CAPSULE.seal.json.")
+    p_seal.add_argument("capsule")
+    p_verify = sub.add_parser("verify", help="Verify all or some entries against CAPSULE.seal.json.")
+    p_verify.add_argument("capsule")
+    p_verify.add_argument("entries", nargs="*", help="Only verify these entries.")
+    p_verify.add_argument("--root", help="Expected Merkle root.")
+    p_diff = sub.add_parser("diff", help="List entries that differ between two seals.")
+    p_diff.add_argument("old")
+    p_diff.add_argument("new")
+    for p in (p_seal, p_verify):
+        p.add_argument("--workers", type=int, default=None, help="Hashing threads.")
+    args = parser.parse_args()
+
+    if args.command == "seal":
+        digest = seal_file(args.capsule)
+        seal = seal_archive(args.capsule, args.workers)
+        write_seal(args.capsule, seal)
+        print(f"🔐 {args.capsule}: sha256 {digest}, merkle root {seal['root']} ({len(seal['entries'])} entries)")
+    elif args.command == "verify":
+        report = verify_seal(args.capsule, names=args.entries or None, workers=args.workers, expected_root=args.root)
+        print(json.dumps(report, indent=2))
+        raise SystemExit(0 if report["ok"] else 1)
+    else:
+        print(json.dumps(diff_seals(load_seal(args.old), load_seal(args.new)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Entry bodies shared by several generator scripts.
+
+Keeping one copy means every capsule carries byte-identical entries,
+which the blob store (capsule_blobs.py) then holds only once.
+"""
+
+GPT_UI_SYNC_JS = """function sendToChatGPT(message) {
+  const inputBox = document.querySelector("textarea");
+  const submitButton = inputBox?.parentNode?.querySelector("button");
+  if (!inputBox || !submitButton) return console.warn("[Agent 0] GPT input field not found.");
+  inputBox.value = message;
+  inputBox.dispatchEvent(new Event("input", { bubbles: true }));
+  setTimeout(() => { submitButton.click(); }, 300);
+}
+
+function readLatestResponse(callback) {
+  const observer = new MutationObserver(() => {
+    const responses = document.querySelectorAll(".markdown");
+    const latest = responses[responses.length - 1];
+    if (latest && latest.innerText) {
+      callback(latest.innerText);
+      observer.disconnect();
+    }
+  });
+  observer.observe(document.body, { childList: true, subtree: true });
+}
+
+chrome.runtime.onMessage.addListener((msg, sender, sendResponse) => {
+  if (msg.type === "gpt_sync") {
+    sendToChatGPT(msg.prompt);
+    readLatestResponse((reply) => sendResponse({ reply }));
+    return true;
+  }
+});
+""".strip()
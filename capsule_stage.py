@@ -0,0 +1,95 @@
+"""Cheap, rerunnable staging of files for capsule bundles.
+
+Files are staged as hardlinks when source and staging area share a
+filesystem, as copy-on-write clones (FICLONE) when the filesystem supports
+them, and as plain copies otherwise. A staged item whose size and mtime
+still match its source (or which is the same inode) is left alone, so a
+rerun only touches what changed. Staged trees are mirrored: files that
+disappeared from the source are removed from the stage.
+"""
+import os
+import shutil
+
+FICLONE = 0x40049409  # linux/fs.h
+
+_link_ok = {}
+
+
+def _same(src_stat, dst):
+    try:
+        st = os.stat(dst)
+    except OSError:
+        return False
+    if (st.st_dev, st.st_ino) == (src_stat.st_dev, src_stat.st_ino):
+        return True
+    return st.st_size == src_stat.st_size and st.st_mtime_ns == src_stat.st_mtime_ns
+
+
+def _clone(src, dst):
+    import fcntl
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            os.remove(dst)
+            raise
+    shutil.copystat(src, dst)
+
+
+def stage_file(src, dst):
+    """Make ``dst`` a copy of ``src``; returns "unchanged", "linked", "cloned" or "copied"."""
+    src_stat = os.stat(src)
+    if _same(src_stat, dst):
+        return "unchanged"
+    if os.path.lexists(dst):
+        _remove(dst)
+    dev = src_stat.st_dev
+    if _link_ok.get(dev, True):
+        try:
+            os.link(src, dst)
+            return "linked"
+        except OSError:
+            _link_ok[dev] = False  # cross-device or no hardlink support: don't retry per file
+    if os.name == "posix":
+        try:
+            _clone(src, dst)
+            return "cloned"
+        except (OSError, ImportError):
+            pass
+    shutil.copy2(src, dst)
+    return "copied"
+
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+
+def prune(directory, keep):
+    """Remove the entries of ``directory`` whose names are not in ``keep``; returns how many went."""
+    removed = 0
+    for name in os.listdir(directory):
+        if name not in keep:
+            _remove(os.path.join(directory, name))
+            removed += 1
+    return removed
+
+
+def stage_tree(src, dst, counts=None):
+    """Mirror directory ``src`` into ``dst`` with stage_file(); returns the per-outcome counts."""
+    counts = counts if counts is not None else {}
+    for root, dirs, files in os.walk(src):
+        rel = os.path.relpath(root, src)
+        target = os.path.normpath(os.path.join(dst, rel))
+        if os.path.lexists(target) and not os.path.isdir(target):
+            _remove(target)  # was a file in an earlier run
+        os.makedirs(target, exist_ok=True)
+        removed = prune(target, set(dirs) | set(files))
+        if removed:
+            counts["removed"] = counts.get("removed", 0) + removed
+        for name in files:
+            outcome = stage_file(os.path.join(root, name), os.path.join(target, name))
+            counts[outcome] = counts.get(outcome, 0) + 1
+    return counts
@@ -0,0 +1,111 @@
+"""Watch a capsule drop directory and report capsules once they are complete.
+
+A capsule counts as ready when its (size, mtime) signature has not changed
+for ``settle`` seconds and it opens as a zip, so half-copied uploads are
+never audited. When ``watchdog`` is installed, filesystem events wake the
+loop immediately; otherwise the directory is polled with ``os.scandir``
+(a single directory listing, cheap enough to run several times a second).
+"""
+import os
+import threading
+import time
+import zipfile
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    _HAS_WATCHDOG = True
+except ImportError:
+    _HAS_WATCHDOG = False
+
+CAPSULE_EXTENSIONS = (".zip", ".camp")
+
+
+def _signature(entry):
+    st = entry.stat()
+    return st.st_size, st.st_mtime_ns
+
+
+if _HAS_WATCHDOG:
+    class _WakeHandler(FileSystemEventHandler):
+        def __init__(self, wake):
+            self.wake = wake
+
+        def on_any_event(self, event):
+            if str(getattr(event, "dest_path", "") or event.src_path).endswith(CAPSULE_EXTENSIONS):
+                self.wake.set()
+
+
+class CapsuleWatcher:
+    def __init__(self, base_dir, settle=0.3, poll_interval=0.2, file=None):
+        self.base_dir = base_dir
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.file = file     # where warnings go (print's default when None)
+        self.known = {}      # path -> signature already handed out (or rejected)
+        self._pending = {}   # path -> (signature, first seen with that signature)
+        self._wake = threading.Event()
+
+    def snapshot(self):
+        signatures = {}
+        with os.scandir(self.base_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(CAPSULE_EXTENSIONS) and entry.is_file():
+                    try:
+                        signatures[entry.path] = _signature(entry)
+                    except FileNotFoundError:
+                        pass
+        return signatures
+
+    def mark_current(self):
+        """Treat everything already in the directory as handled (after a batch run)."""
+        self.known = self.snapshot()
+        self._pending.clear()
+
+    def poll(self):
+        """Return the sorted capsule paths that became ready since the last poll."""
+        now = time.monotonic()
+        current = self.snapshot()
+        ready = []
+        for path, signature in current.items():
+            if self.known.get(path) == signature:
+                continue
+            seen = self._pending.get(path)
+            if seen is None or seen[0] != signature:
+                self._pending[path] = (signature, now)
+            elif now - seen[1] >= self.settle:
+                del self._pending[path]
+                self.known[path] = signature
+                if zipfile.is_zipfile(path):
+                    ready.append(path)
+                else:
+                    print(f"⚠️ {os.path.basename(path)} is not a valid archive; skipping until it changes.",
+                          file=self.file, flush=True)
+        for path in set(self.known) - set(current):
+            del self.known[path]
+        for path in set(self._pending) - set(current):
+            del self._pending[path]
+        return sorted(ready)
+
+    def run(self, on_ready, stop_event=None):
+        """Call ``on_ready(path)`` for each ready capsule until ``stop_event`` is set."""
+        stop_event = stop_event or threading.Event()
+        observer = None
+        if _HAS_WATCHDOG:
+            observer = Observer()
+            observer.schedule(_WakeHandler(self._wake), self.base_dir, recursive=False)
+            observer.start()
+        try:
+            while not stop_event.is_set():
+                for path in self.poll():
+                    on_ready(path)
+                # Sleep until the next poll, or until settling capsules are due.
+                timeout = min(self.poll_interval, self.settle) if self._pending else self.poll_interval
+                if observer and not self._pending:
+                    timeout = max(timeout, 1.0)
+                self._wake.wait(timeout)
+                self._wake.clear()
+        finally:
+            if observer:
+                observer.stop()
+                observer.join()
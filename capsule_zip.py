@@ -0,0 +1,146 @@
+"""Zip helpers for repacking capsules without recompressing untouched entries.
+
+zipfile has no public API for copying an entry's compressed bytes, so
+copy_raw_entry reads them from the source archive's local header and
+appends them to the destination with a cloned ZipInfo (CRC and sizes
+included), exactly as ZipFile.write would have laid them out.
+"""
+import hashlib
+import struct
+import time
+import zipfile
+import zlib
+
+LOCAL_HEADER_SIZE = 30
+LOCAL_HEADER_MAGIC = b"PK\x03\x04"
+DATA_DESCRIPTOR_FLAG = 0x08
+ZIP64_EXTRA_ID = 0x0001
+COPY_CHUNK = 1 << 20
+
+
+def raw_entry_offset(zip_ref, info):
+    fp = zip_ref.fp
+    fp.seek(info.header_offset)
+    header = fp.read(LOCAL_HEADER_SIZE)
+    if len(header) != LOCAL_HEADER_SIZE or header[:4] != LOCAL_HEADER_MAGIC:
+        raise zipfile.BadZipFile(f"Bad local file header for {info.filename!r}")
+    name_len, extra_len = struct.unpack("<HH", header[26:30])
+    return info.header_offset + LOCAL_HEADER_SIZE + name_len + extra_len
+
+
+def iter_raw_entry(zip_ref, info, chunk_size=COPY_CHUNK):
+    """Yield the stored (still compressed) bytes of ``info`` in chunks."""
+    offset, remaining = raw_entry_offset(zip_ref, info), info.compress_size
+    while remaining:
+        zip_ref.fp.seek(offset)
+        chunk = zip_ref.fp.read(min(chunk_size, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated data for {info.filename!r}")
+        offset += len(chunk)
+        remaining -= len(chunk)
+        yield chunk
+
+
+def read_raw_entry(zip_ref, info):
+    return b"".join(iter_raw_entry(zip_ref, info))
+
+
+def _strip_zip64_extra(extra):
+    # ZipInfo.FileHeader appends its own zip64 record when needed.
+    out, i = [], 0
+    while i + 4 <= len(extra):
+        tag, size = struct.unpack("<HH", extra[i:i + 4])
+        if tag != ZIP64_EXTRA_ID:
+            out.append(extra[i:i + 4 + size])
+        i += 4 + size
+    return b"".join(out)
+
+
+def clone_info(info):
+    zinfo = zipfile.ZipInfo(info.filename, info.date_time)
+    zinfo.compress_type = info.compress_type
+    zinfo.comment = info.comment
+    zinfo.extra = _strip_zip64_extra(info.extra)
+    zinfo.create_system = info.create_system
+    zinfo.create_version = info.create_version
+    zinfo.extract_version = info.extract_version
+    zinfo.flag_bits = info.flag_bits & ~DATA_DESCRIPTOR_FLAG
+    zinfo.internal_attr = info.internal_attr
+    zinfo.external_attr = info.external_attr
+    zinfo.CRC = info.CRC
+    zinfo.compress_size = info.compress_size
+    zinfo.file_size = info.file_size
+    return zinfo
+
+
+def compress_entry(arcname, data, compression=zipfile.ZIP_DEFLATED, compresslevel=None, date_time=None):
+    """Compress ``data`` the way ZipFile.writestr would; returns (ZipInfo, raw bytes)."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    zinfo = zipfile.ZipInfo(arcname, date_time or time.localtime(time.time())[:6])
+    zinfo.compress_type = compression
+    zinfo.external_attr = 0o600 << 16
+    zinfo.file_size = len(data)
+    zinfo.CRC = zlib.crc32(data)
+    if compression == zipfile.ZIP_DEFLATED:
+        level = zlib.Z_DEFAULT_COMPRESSION if compresslevel is None else compresslevel
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        raw = compressor.compress(data) + compressor.flush()
+    elif compression == zipfile.ZIP_STORED:
+        raw = data
+    else:
+        raise ValueError(f"Unsupported compression for raw writes: {compression}")
+    zinfo.compress_size = len(raw)
+    return zinfo, raw
+
+
+def write_raw_entry(zipf, zinfo, chunks):
+    """Append an already-compressed entry to ``zipf`` (opened for writing).
+
+    Returns the SHA-256 of the stored bytes, which is what the Merkle seal
+    in capsule_seal records per entry.
+    """
+    if zinfo.filename in zipf.NameToInfo:
+        raise ValueError(f"Duplicate entry {zinfo.filename!r}")
+    sha = hashlib.sha256()
+    zinfo.header_offset = zipf.fp.tell()
+    zipf.fp.write(zinfo.FileHeader())
+    for chunk in chunks:
+        zipf.fp.write(chunk)
+        sha.update(chunk)
+    zipf.filelist.append(zinfo)
+    zipf.NameToInfo[zinfo.filename] = zinfo
+    zipf.start_dir = zipf.fp.tell()
+    zipf._didModify = True
+    return sha.hexdigest()
+
+
+def copy_raw_entry(zip_ref, info, zipf):
+    zinfo = clone_info(info)
+    return zinfo, write_raw_entry(zipf, zinfo, iter_raw_entry(zip_ref, info))
+
+
+def repack_into(zip_ref, zipf, changes):
+    """Copy ``zip_ref`` into the open ``zipf`` with ``changes`` ({arcname: str|bytes}) applied.
+
+    Untouched entries are copied byte-for-byte from the source archive;
+    only changed or injected entries are compressed. Returns
+    {arcname: (ZipInfo, stored-bytes digest)} for every written entry.
+    """
+    written = {}
+    # NameToInfo holds the last ZipInfo per name, so a duplicated entry is
+    # copied once and the last copy wins, as it does for zip_ref.read().
+    for info in list(zip_ref.NameToInfo.values()):
+        if info.is_dir() or info.filename in changes:
+            continue
+        written[info.filename] = copy_raw_entry(zip_ref, info, zipf)
+    for arcname, data in changes.items():
+        zinfo, raw = compress_entry(arcname, data, zipf.compression, zipf.compresslevel)
+        written[arcname] = zinfo, write_raw_entry(zipf, zinfo, [raw])
+    return written
+
+
+def repack_capsule(zip_ref, dst_path, changes, compression=zipfile.ZIP_DEFLATED):
+    with zipfile.ZipFile(dst_path, "w", compression) as zipf:
+        repack_into(zip_ref, zipf, changes)
+    return dst_path
@@ -1,12 +1,11 @@
-import qrcode
-from PIL import Image, ImageDraw, ImageFont
+from capsule_glyphs import render_png
 
 # === Physical Shrine Token Generator ===
 
 # 1. QR launch glyph
 qr_path = "/mnt/data/QR_ShrineToken_Capsule_Dev_Shell_Kit.png"
 launch_uri = "capsule://launch/Capsule_Dev_Shell_Kit_SHRINE"
-qr_img = qrcode.make(launch_uri)
+qr_png = render_png(launch_uri)  # cached by payload, no PIL needed
 
 # 2. Shrine Desktop Stub (.desktop launcher for Linux)
 desktop_stub_path = "/mnt/data/Launch_Capsule_Shrine.desktop"
@@ -33,6 +32,7 @@ echo "✅ Capsule is now up to date."
 """)
 
 # Save QR
-qr_img.save(qr_path)
+with open(qr_path, "wb") as f:
+    f.write(qr_png)
 
 print((qr_path, desktop_stub_path, update_script_path))
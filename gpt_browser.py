@@ -1,6 +1,6 @@
 import zipfile
 import os
-import hashlib
+from capsule_seal import hash_file
 
 SHRINE_PATH = "gpt_import/Operator_Overlay_Shrine_Ready.zip"
 
@@ -10,10 +10,8 @@ def validate_shrine(zip_path):
         print("⚠️ Shrine ZIP not found.")
         return False
 
-    with open(zip_path, "rb") as f:
-        content = f.read()
-        sha256_hash = hashlib.sha256(content).hexdigest()
-        print(f"[Shrine] SHA256: {sha256_hash}")
+    sha256_hash = hash_file(zip_path)
+    print(f"[Shrine] SHA256: {sha256_hash}")
 
     return True
 
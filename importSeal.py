@@ -1,31 +1,28 @@
-import hashlib
 import zipfile
-import qrcode
-import shutil
-import os
 from datetime import datetime
+from capsule_glyphs import write_png
+from capsule_seal import copy_sealed, seal_archive, write_seal
 
 # === Define paths ===
 light3_zip = "/mnt/data/light3.zip"
 camp_output = "/mnt/data/Light3_Reflex_Shrine_Healed.camp"
 sig_output = camp_output + ".sig"
+seal_output = camp_output + ".seal.json"
 readme_output = "/mnt/data/README_Light3_Reflex_Shrine_Healed.md"
 qr_output = "/mnt/data/QR_Light3_Reflex_Shrine_Healed.png"
 blessing_log = "/mnt/data/blessing.log"
 
 # === Seal: Copy and rename .zip to .camp ===
-shutil.copyfile(light3_zip, camp_output)
+# === Signature Blessing: SHA256 (hashed while copying) ===
+digest = copy_sealed(light3_zip, camp_output, sig_output)
 
-# === Signature Blessing: SHA256 ===
-with open(camp_output, "rb") as f:
-    digest = hashlib.sha256(f.read()).hexdigest()
-    with open(sig_output, "w") as sig:
-        sig.write(f"{digest}  {os.path.basename(camp_output)}")
+# === Entry Seal: per-entry Merkle digests ===
+merkle = seal_archive(camp_output)
+write_seal(camp_output, merkle, seal_output)
 
 # === QR Glyph: Launch Protocol URI ===
 launch_uri = "camp://Light3_Reflex_Shrine_Healed?sigil=verified&entry=aura-dashboard.html"
-qr_img = qrcode.make(launch_uri)
-qr_img.save(qr_output)
+write_png(qr_output, launch_uri)
 
 # === README Blessing ===
 timestamp = datetime.utcnow().isoformat() + "Z"
@@ -33,6 +30,7 @@ readme_text = f"""# Light3 Reflex Shrine Capsule
 
 🧠 **Capsule Name:** Light3_Reflex_Shrine_Healed.camp  
 🔏 **SHA256 Signature:** `{digest}`  
+🌳 **Merkle Root:** `{merkle['root']}`  
 📅 **Blessed On:** {timestamp}
 
 ---
@@ -52,7 +50,7 @@ This shrine capsule is a sealed reflex mesh:
 
 1. Extract and run `__launch.sh` or `__launch.bat`
 2. Or scan the QR code using any reflex-aware agent
-3. To validate integrity, compare with the `.sig` file
+3. To validate integrity, compare with the `.sig` file, or check individual entries with `python capsule_seal.py verify Light3_Reflex_Shrine_Healed.camp`
 
 ---
 
@@ -84,4 +82,4 @@ with open(blessing_log, "a") as log:
     log.write(f"[{timestamp}] Light3_Reflex_Shrine_Healed.camp sealed by Agent 0. SHA256: {digest}\n")
 
 # Return paths to sealed output
-print((camp_output, sig_output, readme_output, qr_output, blessing_log))
+print((camp_output, sig_output, seal_output, readme_output, qr_output, blessing_log))
@@ -1,59 +1,28 @@
-import os
-import json
-import yaml
-from zipfile import ZipFile
-import qrcode
+from capsule_blobs import store_from_env
+from capsule_builder import CapsuleBuilder
+from capsule_snippets import GPT_UI_SYNC_JS
 
-# Set up .camp directory
-camp_dir = "/mnt/data/Operator_Browser_Cortex"
-os.makedirs(os.path.join(camp_dir, "overlay"), exist_ok=True)
-
-# Define script contents
-scripts = {
-    "gpt_ui_sync.js": """
-function sendToChatGPT(message) {
-  const inputBox = document.querySelector("textarea");
-  const submitButton = inputBox?.parentNode?.querySelector("button");
-  if (!inputBox || !submitButton) return console.warn("[Agent 0] GPT input field not found.");
-  inputBox.value = message;
-  inputBox.dispatchEvent(new Event("input", { bubbles: true }));
-  setTimeout(() => { submitButton.click(); }, 300);
+# Build definition for build_fleet.py
+CAPSULE_BUILD = {
+    "outputs": ["/mnt/data/Operator_Browser_Cortex.camp"],
 }
 
-function readLatestResponse(callback) {
-  const observer = new MutationObserver(() => {
-    const responses = document.querySelectorAll(".markdown");
-    const latest = responses[responses.length - 1];
-    if (latest && latest.innerText) {
-      callback(latest.innerText);
-      observer.disconnect();
-    }
-  });
+# Capsule entries are built in memory and streamed into the .camp
+capsule = CapsuleBuilder(blob_store=store_from_env())
 
-  observer.observe(document.body, { childList: true, subtree: true });
-}
-
-chrome.runtime.onMessage.addListener((msg, sender, sendResponse) => {
-  if (msg.type === "gpt_sync") {
-    sendToChatGPT(msg.prompt);
-    readLatestResponse((reply) => sendResponse({ reply }));
-    return true;
-  }
-});
-""",
+# Define script contents
+scripts = {
+    "gpt_ui_sync.js": GPT_UI_SYNC_JS,
     "browser_reflex.js": "// Placeholder for DOM intent bridge",
     "camp_route.js": "// Placeholder for .camp drag-n-drop handling"
 }
 
-# Write overlay scripts
+# Overlay scripts
 for name, content in scripts.items():
-    with open(os.path.join(camp_dir, "overlay", name), "w") as f:
-        f.write(content.strip())
+    capsule.add_text(f"overlay/{name}", content.strip())
 
 # UI Console HTML
-html_path = os.path.join(camp_dir, "agent_console.html")
-with open(html_path, "w") as f:
-    f.write("<!-- Agent 0 console placeholder -->")
+capsule.add_text("agent_console.html", "<!-- Agent 0 console placeholder -->")
 
 # Manifest
 manifest = {
@@ -67,8 +36,7 @@ manifest = {
         "run_at": "document_idle"
     }]
 }
-with open(os.path.join(camp_dir, "manifest.json"), "w") as f:
-    json.dump(manifest, f, indent=2)
+capsule.add_json("manifest.json", manifest)
 
 # Reflect.yaml
 reflect_meta = {
@@ -84,23 +52,15 @@ reflect_meta = {
     "entry_point": "agent_console.html",
     "glyph": "operator_mesh_qr.png"
 }
-with open(os.path.join(camp_dir, "reflect.yaml"), "w") as f:
-    yaml.dump(reflect_meta, f)
+capsule.add_yaml("reflect.yaml", reflect_meta)
 
 # QR code
-qr_path = os.path.join(camp_dir, "operator_mesh_qr.png")
-qrcode.make("camp://Operator_Browser_Cortex?entry=agent_console.html").save(qr_path)
+capsule.add_qr("operator_mesh_qr.png", "camp://Operator_Browser_Cortex?entry=agent_console.html")
 
-# Zip everything into a .camp
-camp_zip_path = "/mnt/data/Operator_Browser_Cortex.camp"
-with ZipFile(camp_zip_path, "w") as zipf:
-    for root, _, files in os.walk(camp_dir):
-        for file in files:
-            full_path = os.path.join(root, file)
-            arcname = os.path.relpath(full_path, start=camp_dir)
-            zipf.write(full_path, arcname=arcname)
+# Stream everything into a .camp
+camp_zip_path = capsule.build("/mnt/data/Operator_Browser_Cortex.camp")
 
-print(camp_zip_path)
+print(camp_zip_path)
 
 
 
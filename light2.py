@@ -1,10 +1,9 @@
-import os
-import json
-from zipfile import ZipFile
+from capsule_builder import CapsuleBuilder
 
-# Create directory for console upgrades
-overlay_dir = "/mnt/data/reflex_overlay_upgrade"
-os.makedirs(overlay_dir, exist_ok=True)
+# Build definition for build_fleet.py
+CAPSULE_BUILD = {
+    "outputs": ["/mnt/data/Reflex_Overlay_Upgrade.zip"],
+}
 
 # --- 1. agent_console.html (reflex-aware UI) ---
 console_html = """
@@ -88,17 +87,10 @@ function autoPilot() {
 setInterval(autoPilot, 3000);
 """
 
-# --- Write files ---
-with open(os.path.join(overlay_dir, "agent_console.html"), "w") as f:
-    f.write(console_html.strip())
-
-with open(os.path.join(overlay_dir, "reflex_overlay.js"), "w") as f:
-    f.write(reflex_overlay_js.strip())
-
-# Package upgrade ZIP
-upgrade_zip_path = "/mnt/data/Reflex_Overlay_Upgrade.zip"
-with ZipFile(upgrade_zip_path, "w") as zipf:
-    zipf.write(os.path.join(overlay_dir, "agent_console.html"), arcname="agent_console.html")
-    zipf.write(os.path.join(overlay_dir, "reflex_overlay.js"), arcname="reflex_overlay.js")
+# --- Package upgrade ZIP (built in memory) ---
+upgrade = CapsuleBuilder()
+upgrade.add_text("agent_console.html", console_html.strip())
+upgrade.add_text("reflex_overlay.js", reflex_overlay_js.strip())
+upgrade_zip_path = upgrade.build("/mnt/data/Reflex_Overlay_Upgrade.zip")
 
 print(upgrade_zip_path)
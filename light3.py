@@ -1,9 +1,9 @@
-import os
-from zipfile import ZipFile
+from capsule_builder import CapsuleBuilder
 
-# Setup directory
-socket_dir = "/mnt/data/reflex_socket_fused"
-os.makedirs(socket_dir, exist_ok=True)
+# Build definition for build_fleet.py
+CAPSULE_BUILD = {
+    "outputs": ["/mnt/data/Reflex_Socket_Fused.zip"],
+}
 
 # --- reflex_socket.py ---
 reflex_socket_py = """
@@ -46,14 +46,7 @@ if __name__ == "__main__":
     asyncio.run(main())
 """
 
-# Write reflex_socket.py
-socket_path = os.path.join(socket_dir, "reflex_socket.py")
-with open(socket_path, "w") as f:
-    f.write(reflex_socket_py.strip())
-
 # Package it
-socket_zip_path = "/mnt/data/Reflex_Socket_Fused.zip"
-with ZipFile(socket_zip_path, "w") as zipf:
-    zipf.write(socket_path, arcname="reflex_socket.py")
+socket_zip_path = CapsuleBuilder().add_text("reflex_socket.py", reflex_socket_py.strip()).build("/mnt/data/Reflex_Socket_Fused.zip")
 
 print(socket_zip_path)
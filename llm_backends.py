@@ -0,0 +1,502 @@
+"""Pluggable chat-completion backends for the Socket.IO dashboard.
+
+Every completion in camp_unpack_and_run_v2.py goes through one
+``LLMGateway``. The gateway bounds how many completions are in flight,
+gives each one a deadline, retries transient failures while the deadline
+allows, and can run a request in the background so a slow completion
+never holds up the handler that asked for it.
+
+Backends (``LLM_BACKEND``):
+
+- ``openai``: the Chat Completions HTTP API, over a pooled keep-alive session
+- ``local``: the reflex GPT endpoint on ``http://localhost:11434/gpt``
+- ``stub``: deterministic local replies, for development and load tests
+
+    gateway = gateway_from_env(spawn=socketio.start_background_task)
+    text = gateway.complete([{"role": "user", "content": "hi"}]).text
+    gateway.submit(messages, on_done)   # on_done(completion, error)
+    for event in gateway.stream(messages):   # {"delta": ...}, ..., {"done": True, ...}
+        ...
+
+Backends that can't stream (``local``) deliver their reply as one chunk.
+With a ``ResponseCache`` (llm_cache.py), repeated requests are answered
+from the cache without taking a slot or touching the backend.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from llm_cache import cache_from_env, request_key
+
+DEFAULT_MODEL = "gpt-4"
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_CONCURRENCY = 16
+DEFAULT_RETRIES = 2
+CONNECT_TIMEOUT = 3.05
+OPENAI_URL = "https://api.openai.com/v1/chat/completions"
+LOCAL_URL = "http://localhost:11434/gpt"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """A completion failed; ``retryable`` says whether trying again may help."""
+
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class LLMTimeout(LLMError):
+    """The request's deadline passed before a completion arrived."""
+
+
+class Completion:
+    def __init__(self, text, usage=None, backend=None, model=None, cached=False):
+        self.text = text
+        self.usage = usage or {}
+        self.backend = backend
+        self.model = model
+        self.cached = cached
+
+    def to_dict(self):
+        return {"response": self.text, "usage": self.usage, "backend": self.backend, "model": self.model,
+                "cached": self.cached}
+
+    @classmethod
+    def from_dict(cls, data, cached=False):
+        return cls(data["response"], data.get("usage"), data.get("backend"), data.get("model"), cached)
+
+
+def chat_messages(prompt, system="You are a helpful assistant."):
+    return [{"role": "system", "content": system}, {"role": "user", "content": prompt}]
+
+
+# --- backends --------------------------------------------------------------
+
+def _last_user_message(messages):
+    content = next((m.get("content") for m in reversed(messages) if m.get("role") == "user"), None)
+    return "" if content is None else str(content)
+
+
+def _check_deadline(deadline, name):
+    if time.monotonic() > deadline:
+        raise LLMTimeout(f"{name} backend stream passed its deadline")
+
+
+class HTTPBackend:
+    """Shared pooled ``requests.Session``; subclasses build the request and parse the reply.
+
+    ``stream()`` is a generator of text deltas that returns the final
+    Completion; by default the whole reply arrives as one delta.
+    """
+
+    name = "http"
+
+    def __init__(self, url, pool_size=DEFAULT_CONCURRENCY):
+        self.url = url
+        self.pool_size = pool_size
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size)
+                self._session.mount("http://", adapter)
+                self._session.mount("https://", adapter)
+            return self._session
+
+    def close(self):
+        if self._session:
+            self._session.close()
+            self._session = None
+
+    def stream(self, messages, model, temperature, max_tokens, timeout):
+        completion = self.complete(messages, model, temperature, max_tokens, timeout)
+        if completion.text:
+            yield completion.text
+        return completion
+
+    def _post(self, payload, timeout, headers=None, stream=False):
+        import requests
+        try:
+            res = self.session.post(self.url, json=payload, headers=headers, stream=stream,
+                                    timeout=(min(CONNECT_TIMEOUT, timeout), timeout))
+        except requests.Timeout as e:
+            raise LLMTimeout(f"{self.name} backend timed out: {e}") from e
+        except requests.ConnectionError as e:
+            raise LLMError(f"{self.name} backend unreachable: {e}", retryable=True) from e
+        if res.status_code >= 400:
+            raise LLMError(f"{self.name} backend returned HTTP {res.status_code}: {res.text[:200]}",
+                           retryable=res.status_code in RETRY_STATUS)
+        if stream:
+            return res
+        try:
+            return res.json()
+        except ValueError as e:
+            raise LLMError(f"{self.name} backend returned invalid JSON") from e
+
+
+class OpenAIBackend(HTTPBackend):
+    name = "openai"
+
+    def __init__(self, api_key=None, url=OPENAI_URL, pool_size=DEFAULT_CONCURRENCY):
+        super().__init__(url, pool_size)
+        self.api_key = api_key if api_key is not None else os.getenv("API_KEY_OPENAI", "")
+
+    def complete(self, messages, model, temperature, max_tokens, timeout):
+        data = self._post({"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens},
+                          timeout, headers={"Authorization": f"Bearer {self.api_key}"})
+        try:
+            text = data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            raise LLMError("openai backend returned no choices") from e
+        return Completion(text, data.get("usage"), self.name, data.get("model", model))
+
+    def stream(self, messages, model, temperature, max_tokens, timeout):
+        import requests
+        deadline = time.monotonic() + timeout
+        res = self._post({"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens,
+                          "stream": True, "stream_options": {"include_usage": True}},
+                         timeout, headers={"Authorization": f"Bearer {self.api_key}"}, stream=True)
+        parts, usage = [], None
+        try:
+            # Server-sent events: "data: {chunk}" lines, terminated by "data: [DONE]".
+            for line in res.iter_lines():
+                _check_deadline(deadline, self.name)
+                if not line.startswith(b"data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == b"[DONE]":
+                    break
+                chunk = json.loads(payload)
+                usage = chunk.get("usage") or usage
+                for choice in chunk.get("choices", []):
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+        except requests.Timeout as e:
+            raise LLMTimeout(f"openai backend stream timed out: {e}") from e
+        except requests.RequestException as e:
+            raise LLMError(f"openai backend stream broke: {e}") from e
+        except ValueError as e:
+            raise LLMError("openai backend sent an invalid stream chunk") from e
+        finally:
+            res.close()
+        return Completion("".join(parts), usage, self.name, model)
+
+
+class LocalBackend(HTTPBackend):
+    """The ``{"prompt": ...} -> {"response": ...}`` endpoint served by flask_gpt_sync.py."""
+
+    name = "local"
+
+    def __init__(self, url=None, pool_size=DEFAULT_CONCURRENCY):
+        super().__init__(url or os.getenv("LLM_LOCAL_URL", LOCAL_URL), pool_size)
+
+    def complete(self, messages, model, temperature, max_tokens, timeout):
+        prompt = _last_user_message(messages)
+        data = self._post({"prompt": prompt}, timeout)
+        if "response" not in data:
+            raise LLMError(f"local backend error: {data.get('error', 'no response')}")
+        return Completion(data["response"], {}, self.name, model)
+
+
+class StubBackend:
+    """Deterministic replies without a network; ``delay`` simulates generation time."""
+
+    name = "stub"
+
+    def __init__(self, delay=None):
+        self.delay = float(os.getenv("LLM_STUB_DELAY", "0")) if delay is None else delay
+
+    def complete(self, messages, model, temperature, max_tokens, timeout):
+        stream = self.stream(messages, model, temperature, max_tokens, timeout)
+        while True:
+            try:
+                next(stream)
+            except StopIteration as done:
+                return done.value
+
+    def stream(self, messages, model, temperature, max_tokens, timeout):
+        """Yield the reply word by word, spreading ``delay`` evenly across the words."""
+        deadline = time.monotonic() + timeout
+        prompt = _last_user_message(messages)
+        words = f"Reflective reply: {prompt}".split(" ")
+        for i, word in enumerate(words):
+            if self.delay:
+                step = self.delay / len(words)
+                if time.monotonic() + step > deadline:
+                    time.sleep(max(0.0, deadline - time.monotonic()))
+                    raise LLMTimeout("stub backend timed out")
+                time.sleep(step)
+            yield word if i == 0 else " " + word
+        text = " ".join(words)
+        return Completion(text, {"prompt_tokens": len(prompt.split()), "completion_tokens": len(words),
+                                 "total_tokens": len(prompt.split()) + len(words)}, self.name, model)
+
+    def close(self):
+        pass
+
+
+BACKENDS = {"openai": OpenAIBackend, "local": LocalBackend, "stub": StubBackend}
+
+
+# --- gateway ---------------------------------------------------------------
+
+class _Flight:
+    """One upstream call and everything it has produced so far, shared by identical requests."""
+
+    def __init__(self):
+        self.events = []
+        self.done = None
+        self.error = None
+        self._cond = threading.Condition()
+
+    def publish(self, event):
+        with self._cond:
+            self.events.append(event)
+            self._cond.notify_all()
+
+    def finish(self, done=None, error=None):
+        with self._cond:
+            self.done, self.error = done, error
+            self._cond.notify_all()
+
+    def _finished(self):
+        return self.done is not None or self.error is not None
+
+    def wait_events(self, index, deadline):
+        """Deltas from ``index`` on plus the done event (None until finished); raises on error or timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self.events) > index or self._finished(),
+                                       timeout=max(0.0, deadline - time.monotonic())):
+                raise LLMTimeout("deadline passed")
+            events = self.events[index:]
+            if self.error is not None and not events:
+                raise self.error
+            return events, self.done if self._finished() and self.error is None else None
+
+    def wait_done(self, deadline):
+        with self._cond:
+            if not self._cond.wait_for(self._finished, timeout=max(0.0, deadline - time.monotonic())):
+                raise LLMTimeout("deadline passed")
+            if self.error is not None:
+                raise self.error
+            return self.done
+
+
+class LLMGateway:
+    def __init__(self, backend, max_concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, model=DEFAULT_MODEL, spawn=None, cache=None):
+        self.backend = backend
+        self.timeout = timeout
+        self.retries = retries
+        self.model = model
+        self.spawn = spawn or _spawn_thread
+        self.cache = cache
+        self.backend_id = f"{backend.name}:{getattr(backend, 'url', '')}"
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self.upstream_calls = self.coalesced = 0
+
+    def _cached(self, key):
+        hit = self.cache.get(key) if self.cache is not None else None
+        return Completion.from_dict(hit, cached=True) if hit else None
+
+    def _join(self, key, messages, timeout, model, temperature, max_tokens):
+        """The in-flight upstream call for ``key``, starting one if there is none."""
+        with self._inflight_lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight
+            flight = self._inflight[key] = _Flight()
+            self.upstream_calls += 1
+        # The shared call must outlive the caller that happened to start it: it
+        # runs on the gateway's timeout (or longer, if asked), and every waiter
+        # only enforces its own deadline.
+        self.spawn(self._fly, flight, key, messages, max(self.timeout, timeout or 0), model, temperature, max_tokens)
+        return flight
+
+    def _fly(self, flight, key, messages, timeout, model, temperature, max_tokens):
+        # Runs in a background task, so a requester that goes away doesn't strand the others.
+        # Upstream always streams: complete() callers wait for the end, stream() callers see every delta.
+        try:
+            for event in self._stream(messages, time.monotonic(), timeout, model, temperature, max_tokens):
+                if event.get("done"):
+                    done = event
+                else:
+                    flight.publish(event)
+            if self.cache is not None and done["response"]:
+                self.cache.put(key, Completion.from_dict(done).to_dict())
+            flight.finish(done)
+        except LLMError as e:
+            flight.finish(error=e)
+        except Exception as e:
+            logging.exception("LLM request crashed")
+            flight.finish(error=LLMError(str(e)))
+        finally:
+            with self._inflight_lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+
+    def complete(self, messages, timeout=None, model=None, temperature=0.5, max_tokens=150):
+        """Run one completion within ``timeout`` seconds (queueing included); raises LLMError.
+
+        Identical requests already in flight share that upstream call.
+        """
+        model = model or self.model
+        key = request_key(messages, model, temperature, max_tokens, self.backend_id)
+        completion = self._cached(key)
+        if completion is not None:
+            return completion
+        flight = self._join(key, messages, timeout, model, temperature, max_tokens)
+        return Completion.from_dict(flight.wait_done(time.monotonic() + (timeout or self.timeout)))
+
+    def stream(self, messages, timeout=None, model=None, temperature=0.5, max_tokens=150):
+        """Yield ``{"delta", "index"}`` events as text arrives, then one ``{"done": True, "response", "usage", ...}``.
+
+        The upstream call holds a concurrency slot until it finishes; identical
+        requests already in flight share it and replay its deltas from the
+        start. Transient failures before the first delta are retried; after
+        that they are raised to the consumer (LLMError). A cached reply
+        arrives as a single delta.
+        """
+        start = time.monotonic()
+        deadline = start + (timeout or self.timeout)
+        model = model or self.model
+        key = request_key(messages, model, temperature, max_tokens, self.backend_id)
+        completion = self._cached(key)
+        if completion is not None:
+            yield {"delta": completion.text, "index": 0}
+            elapsed = round(time.monotonic() - start, 6)
+            yield {"done": True, **completion.to_dict(), "chunks": 1, "elapsed": elapsed, "first_token": elapsed}
+            return
+        flight = self._join(key, messages, timeout, model, temperature, max_tokens)
+        index, first_token = 0, None
+        while True:
+            events, done = flight.wait_events(index, deadline)
+            for event in events:
+                if first_token is None:
+                    first_token = time.monotonic() - start
+                yield event
+                index += 1
+            if done is None:
+                continue
+            if index == 0 and done["response"]:
+                first_token = time.monotonic() - start
+                yield {"delta": done["response"], "index": 0}
+                index = 1
+            # Timings are this consumer's own, not the shared call's.
+            event = {**done, "chunks": index, "elapsed": round(time.monotonic() - start, 3)}
+            event.pop("first_token", None)
+            if first_token is not None:
+                event["first_token"] = round(first_token, 3)
+            yield event
+            return
+
+    def _stream(self, messages, start, timeout, model, temperature, max_tokens):
+        deadline = start + (timeout or self.timeout)
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise LLMTimeout("no completion slot became free before the deadline")
+        try:
+            attempt = index = 0
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LLMTimeout("deadline passed")
+                chunks = self.backend.stream(messages, model, temperature, max_tokens, remaining)
+                try:
+                    while True:
+                        try:
+                            delta = next(chunks)
+                        except StopIteration as done:
+                            completion = done.value
+                            break
+                        if index == 0:
+                            first_token = time.monotonic() - start
+                        yield {"delta": delta, "index": index}
+                        index += 1
+                except LLMError as e:
+                    backoff = 0.25 * 2 ** attempt
+                    if index or not e.retryable or attempt >= self.retries or time.monotonic() + backoff >= deadline:
+                        raise
+                    logging.warning(f"LLM stream failed ({e}); retrying in {backoff:.2f}s")
+                    attempt += 1
+                    time.sleep(backoff)
+                    continue
+                finally:
+                    chunks.close()
+                event = {"done": True, **completion.to_dict(), "chunks": index,
+                         "elapsed": round(time.monotonic() - start, 3)}
+                if index:
+                    event["first_token"] = round(first_token, 3)
+                yield event
+                return
+        finally:
+            self._slots.release()
+
+    def submit(self, messages, on_done, **params):
+        """Run complete() in the background and call ``on_done(completion, error)`` when it finishes."""
+        def run():
+            try:
+                completion = self.complete(messages, **params)
+            except LLMError as e:
+                on_done(None, e)
+            except Exception as e:  # never let a background task die silently
+                logging.exception("LLM request crashed")
+                on_done(None, LLMError(str(e)))
+            else:
+                on_done(completion, None)
+        return self.spawn(run)
+
+    def submit_stream(self, messages, on_event, on_error, **params):
+        """Run stream() in the background, calling ``on_event(event)`` per event or ``on_error(error)``."""
+        def run():
+            try:
+                for event in self.stream(messages, **params):
+                    on_event(event)
+            except LLMError as e:
+                on_error(e)
+            except Exception as e:
+                logging.exception("LLM stream crashed")
+                on_error(LLMError(str(e)))
+        return self.spawn(run)
+
+    def stats(self):
+        with self._inflight_lock:
+            return {"upstream_calls": self.upstream_calls, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
+
+    def close(self):
+        self.backend.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+def _spawn_thread(fn, *args, **kwargs):
+    thread = threading.Thread(target=fn, args=args, kwargs=kwargs, daemon=True)
+    thread.start()
+    return thread
+
+
+def gateway_from_env(spawn=None):
+    """Build the gateway from ``LLM_BACKEND``, ``LLM_MODEL``, ``LLM_TIMEOUT``,
+    ``LLM_MAX_CONCURRENCY`` and ``LLM_RETRIES``, plus the ``LLM_CACHE*`` settings read by cache_from_env()."""
+    name = os.getenv("LLM_BACKEND", "openai").lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM_BACKEND {name!r}; expected one of {', '.join(BACKENDS)}")
+    concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", DEFAULT_CONCURRENCY))
+    backend = BACKENDS[name]() if name == "stub" else BACKENDS[name](pool_size=concurrency)
+    return LLMGateway(backend, max_concurrency=concurrency,
+                      timeout=float(os.getenv("LLM_TIMEOUT", DEFAULT_TIMEOUT)),
+                      retries=int(os.getenv("LLM_RETRIES", DEFAULT_RETRIES)),
+                      model=os.getenv("LLM_MODEL", DEFAULT_MODEL), spawn=spawn, cache=cache_from_env())
@@ -0,0 +1,140 @@
+"""Response cache in front of the LLM backends.
+
+Completions are keyed by the backend (name and endpoint URL) and the
+normalized request: model, every message
+(role + content with whitespace collapsed, so the system prompt is
+included), temperature and max_tokens. Entries live in an in-memory LRU
+bounded by entry count and total text size, and expire after a TTL. With
+a ``path``, they are also written to SQLite and survive restarts; a
+memory miss falls back to disk and promotes the entry. Counters are
+exposed through stats().
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_FORMAT = "llm-cache/2"
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_TTL = 3600.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    completion TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def _normalize(text):
+    return " ".join(str(text).split())
+
+
+def request_key(messages, model, temperature, max_tokens, backend=None):
+    """``backend`` identifies where replies come from, so a stub reply is never served as an OpenAI one."""
+    normalized = [[m.get("role", "user"), _normalize(m.get("content", ""))] for m in messages]
+    return hashlib.sha256(json.dumps([CACHE_FORMAT, backend, model, normalized, temperature, max_tokens]).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL, path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.path = path
+        self._entries = OrderedDict()  # key -> (created_at, completion dict, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.disk_hits = self.misses = self.evictions = self.expired = 0
+        self.conn = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.executescript(SCHEMA)
+            if ttl:
+                self.conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - ttl,))
+                self.conn.commit()
+
+    def get(self, key):
+        """The cached completion dict for ``key``, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self.ttl and now - entry[0] > self.ttl:
+                self._drop(key)
+                self.expired += 1
+                entry = None
+            if entry:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if self.conn:
+                row = self.conn.execute("SELECT completion, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row and (not self.ttl or now - row[1] <= self.ttl):
+                    completion = json.loads(row[0])
+                    self._remember(key, completion, row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return completion
+            self.misses += 1
+            return None
+
+    def put(self, key, completion):
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, completion, created_at)
+            if self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO responses (key, completion, created_at) VALUES (?, ?, ?)",
+                                  (key, json.dumps(completion), created_at))
+                self.conn.commit()
+
+    def _remember(self, key, completion, created_at):
+        if key in self._entries:
+            self._drop(key)
+        size = len(completion.get("response") or "")
+        self._entries[key] = (created_at, completion, size)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _drop(self, key):
+        self._bytes -= self._entries.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self.conn:
+                self.conn.execute("DELETE FROM responses")
+                self.conn.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                    "entries": len(self._entries), "bytes": self._bytes, "evictions": self.evictions,
+                    "expired": self.expired, "max_entries": self.max_entries, "ttl": self.ttl,
+                    "persistent": self.path}
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+def cache_from_env():
+    """Build the cache from ``LLM_CACHE``, ``LLM_CACHE_SIZE``, ``LLM_CACHE_MAX_BYTES``,
+    ``LLM_CACHE_TTL`` and ``LLM_CACHE_PATH``; None when ``LLM_CACHE=false``."""
+    if os.getenv("LLM_CACHE", "true").lower() != "true":
+        return None
+    return ResponseCache(max_entries=int(os.getenv("LLM_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+                         max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+                         ttl=float(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL)),
+                         path=os.getenv("LLM_CACHE_PATH") or None)
@@ -1,6 +1,6 @@
 import zipfile
 import os
-import qrcode
+from capsule_glyphs import write_png
 
 # Paths and filenames
 working_dir = "/mnt/data/operator_mesh_extension_output"
@@ -28,7 +28,7 @@ qr_data = {
     "meta": "QR sideload ritual"
 }
 qr_img_path = os.path.join(working_dir, "operator_mesh_qr.png")
-qrcode.make(str(qr_data)).save(qr_img_path)
+write_png(qr_img_path, str(qr_data))
 
 # Create a final zip with all components
 zip_path = "/mnt/data/Operator_Mesh_Extension_Kit_QR_Infused.zip"
@@ -1,10 +1,11 @@
-import os
-import yaml
-from zipfile import ZipFile
+from capsule_builder import CapsuleBuilder
 
-# Recreate directory after reset
-ritual_dir = "/mnt/data/mesh_trigger_ritual"
-os.makedirs(ritual_dir, exist_ok=True)
+# Build definition for build_fleet.py
+CAPSULE_BUILD = {
+    "outputs": ["/mnt/data/Mesh_Trigger_Ritual_Bundle.zip"],
+}
+
+ritual = CapsuleBuilder()
 
 # === 1. trigger_rules.yaml ===
 trigger_rules = {
@@ -26,8 +27,7 @@ trigger_rules = {
         }
     ]
 }
-with open(os.path.join(ritual_dir, "trigger_rules.yaml"), "w") as f:
-    yaml.dump(trigger_rules, f)
+ritual.add_yaml("trigger_rules.yaml", trigger_rules)
 
 # === 2. reflex_overlay.js upgrade ===
 reflex_overlay_js = """
@@ -115,14 +115,9 @@ window.addEventListener("DOMContentLoaded", () => {
 });
 """
 
-# Write reflex_overlay.js
-with open(os.path.join(ritual_dir, "reflex_overlay.js"), "w") as f:
-    f.write(reflex_overlay_js.strip())
+ritual.add_text("reflex_overlay.js", reflex_overlay_js.strip())
 
 # Bundle the ritual
-ritual_zip_path = "/mnt/data/Mesh_Trigger_Ritual_Bundle.zip"
-with ZipFile(ritual_zip_path, "w") as zipf:
-    zipf.write(os.path.join(ritual_dir, "trigger_rules.yaml"), arcname="trigger_rules.yaml")
-    zipf.write(os.path.join(ritual_dir, "reflex_overlay.js"), arcname="reflex_overlay.js")
+ritual_zip_path = ritual.build("/mnt/data/Mesh_Trigger_Ritual_Bundle.zip")
 
 print(ritual_zip_path)